@@ -0,0 +1,185 @@
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import click
+
+from fake_api import FakeNifcloudApi, serve
+
+from playwright.config import PlaywrightConfig
+from playwright.inspired import Inspired, InspiredPlaybook
+from playwright.playhouse.nifcloud import NifcloudPlayhouse
+from playwright.playhouse.nifcloud.module import NifcloudModuleFw
+from playwright.registry import RENDER_BACKENDS
+from playwright.render_pool import RenderPool
+
+import yaml
+
+
+STAGES = ['load_config', 'fetch', 'filter', 'generate_tasks', 'render', 'write']
+
+
+def generate_inspiration(work_dir, describe_workers, task_mode):
+    content = {
+        'playwright_options': {
+            'describe_workers': describe_workers,
+        },
+        'vars': {
+            'nifcloud_users': {
+                'bench': {'access_key': 'BENCH_ACCESS_KEY', 'secret_access_key': 'BENCH_SECRET_ACCESS_KEY'},
+            },
+        },
+        'inspirations': [{
+            'playhouse': 'nifcloud',
+            'user': 'bench',
+            'modules': [{
+                'module': 'nifcloud_fw',
+                'task_mode': task_mode,
+                'excludes': [{'key': 'groupName', 'regexp': '7$'}],
+            }],
+        }],
+    }
+
+    inspiration_path = os.path.join(work_dir, 'bench.insp.yml')
+    with open(inspiration_path, 'w') as f:
+        yaml.safe_dump(content, f, default_flow_style=False)
+
+    return inspiration_path
+
+
+def run_once(inspiration_path, render_backend, render_pool=None):
+    timings = {}
+
+    def measure(stage, func):
+        start = time.perf_counter()
+        result = func()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    def load_config():
+        config = PlaywrightConfig()
+        config.load_file(inspiration_path)
+        return config
+
+    config = measure('load_config', load_config)
+    inspiration = config.inspirations[0]
+
+    playhouse = NifcloudPlayhouse()
+    module = NifcloudModuleFw(playhouse, inspiration['modules'][0])
+
+    def fetch():
+        playhouse.init(config, inspiration)
+        return list(module._generate_resources())
+
+    resources = measure('fetch', fetch)
+    module._generate_resources = lambda: iter(resources)
+
+    target_resources = measure('filter', lambda: list(module._generate_target_resources()))
+    module._generate_target_resources = lambda: iter(target_resources)
+
+    tasks = measure('generate_tasks', lambda: list(module.generate_tasks()))
+
+    inspired = Inspired()
+    inspired.tasks = tasks
+    playbook = InspiredPlaybook(config, render_backend=render_backend, render_pool=render_pool)
+    playbook.append_inspired(inspired)
+
+    content = measure('render', playbook.render)
+
+    def write():
+        with open(playbook.generate_output_path(), 'w') as f:
+            f.write(content)
+
+    measure('write', write)
+
+    return timings, len(tasks), len(content)
+
+
+def compare_baseline(timings, baseline, tolerance, min_delta):
+    regressions = []
+
+    for stage in STAGES:
+        if stage not in baseline:
+            continue
+
+        limit = max(baseline[stage] * tolerance, baseline[stage] + min_delta)
+        if timings[stage] > limit:
+            regressions.append((stage, baseline[stage], timings[stage]))
+
+    return regressions
+
+
+@click.command()
+@click.option('--regions', default=4, help='number of regions')
+@click.option('--groups', default=200, help='number of fw groups per region')
+@click.option('--rules', default=10, help='number of rules per fw group')
+@click.option('--latency', default=0.0, help='seconds of fake API latency per request')
+@click.option('--describe-workers', default=1, help='describe_workers option')
+@click.option('--render-backend', default='template', type=click.Choice(RENDER_BACKENDS), help='render backend')
+@click.option('--render-workers', default=1, type=click.IntRange(min=1), help='number of processes rendering tasks')
+@click.option('--task-mode', default='group', type=click.Choice(NifcloudModuleFw.TASK_MODES), help='task_mode of nifcloud_fw')
+@click.option('--repeat', default=3, help='repeat count, the fastest time of each stage is reported')
+@click.option('--baseline', type=click.Path(), help='baseline json to compare')
+@click.option('--save-baseline', default=False, is_flag=True, help='save results as baseline instead of comparing')
+@click.option('--tolerance', default=1.5, help='ratio to baseline regarded as regression')
+@click.option('--min-delta', default=0.05, help='seconds of slowdown always tolerated')
+@click.option('--json', 'as_json', default=False, is_flag=True, help='output results as json')
+def bench(regions, groups, rules, latency, describe_workers, render_backend, render_workers, task_mode,
+          repeat, baseline, save_baseline, tolerance, min_delta, as_json):
+    api = FakeNifcloudApi(regions=regions, groups=groups, rules=rules, latency=latency)
+
+    # workers are started once, so that repeats measure rendering by warm workers
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.ExitStack() as stack:
+        render_pool = stack.enter_context(RenderPool(render_workers)) if render_workers > 1 else None
+        stack.enter_context(serve(api))
+        inspiration_path = generate_inspiration(work_dir, describe_workers, task_mode)
+
+        best = {}
+        for _ in range(repeat):
+            timings, task_count, content_size = run_once(inspiration_path, render_backend, render_pool)
+            for stage in STAGES:
+                best[stage] = min(best.get(stage, timings[stage]), timings[stage])
+
+    results = {
+        'params': {
+            'regions': regions, 'groups': groups, 'rules': rules, 'latency': latency,
+            'describe_workers': describe_workers, 'render_backend': render_backend, 'render_workers': render_workers,
+            'task_mode': task_mode,
+        },
+        'tasks': task_count,
+        'playbook_bytes': content_size,
+        'timings': best,
+    }
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+    else:
+        click.echo('{} regions x {} groups x {} rules: {} tasks, {} bytes'.format(regions, groups, rules, task_count, content_size))
+        for stage in STAGES:
+            click.echo('  {:<16}{:>10.4f}s'.format(stage, best[stage]))
+        click.echo('  {:<16}{:>10.4f}s'.format('total', sum(best.values())))
+
+    if not baseline:
+        return
+
+    if save_baseline:
+        with open(baseline, 'w') as f:
+            json.dump(best, f, indent=2, sort_keys=True)
+        return
+
+    with open(baseline, 'r') as f:
+        baseline_timings = json.load(f)
+
+    regressions = compare_baseline(best, baseline_timings, tolerance, min_delta)
+    for stage, expected, actual in regressions:
+        click.echo('regression: {} {:.4f}s -> {:.4f}s'.format(stage, expected, actual), err=True)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    bench()
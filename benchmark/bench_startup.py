@@ -0,0 +1,83 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+
+COMMANDS = {
+    'version': ['version'],
+    'inspire_help': ['inspire', '--help'],
+}
+
+# dependencies which commands above should not load
+HEAVY_MODULES = ['jinja2', 'yaml', 'sleety', 'xmlschema', 'requests', 'future']
+
+# runs a command in a fresh interpreter, then prints heavy modules it has loaded
+_SCRIPT = '''
+import json, sys
+from playwright.cli import cli
+try:
+    cli(sys.argv[1:])
+except SystemExit:
+    pass
+heavy_modules = {heavy_modules!r}
+sys.stderr.write(json.dumps(sorted(name for name in heavy_modules if name in sys.modules)))
+'''
+
+
+def run_command(args):
+    script = _SCRIPT.format(heavy_modules=HEAVY_MODULES)
+
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-c', script] + args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+    elapsed = time.perf_counter() - start
+
+    loaded_modules = json.loads(process.stderr.decode('utf-8').strip().splitlines()[-1])
+    return elapsed, loaded_modules
+
+
+@click.command()
+@click.option('--repeat', default=10, help='repeat count of each command')
+@click.option('--max-seconds', type=float, help='exits with error when median time of a command is over it')
+@click.option('--json', 'as_json', default=False, is_flag=True, help='output results as json')
+def bench(repeat, max_seconds, as_json):
+    results = {}
+
+    for name, args in COMMANDS.items():
+        timings = []
+        for _ in range(repeat):
+            elapsed, loaded_modules = run_command(args)
+            timings.append(elapsed)
+
+        results[name] = {
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'heavy_modules': loaded_modules,
+        }
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            click.echo('  {:<16}{:>10.4f}s (min {:.4f}s)  heavy modules: {}'.format(
+                name, result['median'], result['min'], ', '.join(result['heavy_modules']) or '-'))
+
+    failed = False
+    for name, result in results.items():
+        if result['heavy_modules']:
+            click.echo('{} loads {}'.format(name, ', '.join(result['heavy_modules'])), err=True)
+            failed = True
+
+        if max_seconds is not None and result['median'] > max_seconds:
+            click.echo('{} takes {:.4f}s over {:.4f}s'.format(name, result['median'], max_seconds), err=True)
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,130 @@
+import random
+import time
+from contextlib import contextmanager
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+import requests
+from requests.adapters import BaseAdapter
+
+
+_NAMESPACE = 'https://cp.cloud.nifty.com/api/'
+
+
+class FakeNifcloudApi():
+    # local stand-in of NIFCLOUD computing API serving a synthetic inventory
+
+    def __init__(self, regions=4, groups=100, rules=10, latency=0.0, seed=0):
+        self.region_names = ['jp-bench-{}'.format(index + 1) for index in range(regions)]
+        self.groups = groups
+        self.rules = rules
+        self.latency = latency
+        self.seed = seed
+
+        self.request_count = 0
+        self.response_bytes = 0
+        self._responses = {}
+
+    def respond(self, region_name, action, params=None):
+        if action == 'DescribeRegions':
+            body = self._describe_regions()
+        elif action == 'DescribeSecurityGroups':
+            body = self._describe_security_groups(region_name)
+        else:
+            raise ValueError('unsupported action: {}'.format(action))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        text = '<{0}Response xmlns="{1}"><requestId>bench</requestId>{2}</{0}Response>'.format(action, _NAMESPACE, body)
+
+        self.request_count += 1
+        self.response_bytes += len(text)
+        return text
+
+    def _describe_regions(self):
+        items = []
+        for index, region_name in enumerate(self.region_names):
+            items.append('<item><regionName>{}</regionName><regionEndpoint>{}</regionEndpoint><isDefault>{}</isDefault></item>'.format(
+                region_name, 'computing.{}.api.cloud.nifty.com'.format(region_name), 'true' if index == 0 else 'false'))
+
+        return '<regionInfo>{}</regionInfo>'.format(''.join(items))
+
+    def _describe_security_groups(self, region_name):
+        if region_name not in self._responses:
+            self._responses[region_name] = self._generate_security_groups(region_name)
+
+        return self._responses[region_name]
+
+    def _generate_security_groups(self, region_name):
+        rnd = random.Random('{}:{}'.format(self.seed, region_name))
+        items = []
+
+        for group_index in range(self.groups):
+            group_name = 'bench{:06d}'.format(group_index)
+            permissions = [self._generate_permission(rnd, group_index) for _ in range(self.rules)]
+
+            items.append(
+                '<item><ownerId>bench</ownerId><groupName>{}</groupName><groupStatus>applied</groupStatus>'
+                '<ipPermissions>{}</ipPermissions><groupRuleLimit>100</groupRuleLimit><groupLogLimit>1000</groupLogLimit>'
+                '<availabilityZone>{}</availabilityZone></item>'.format(group_name, ''.join(permissions), escape(region_name + 'a')))
+
+        return '<securityGroupInfo>{}</securityGroupInfo>'.format(''.join(items))
+
+    def _generate_permission(self, rnd, group_index):
+        protocol = rnd.choice(['TCP', 'UDP', 'ICMP', 'ANY'])
+        elements = ['<ipProtocol>{}</ipProtocol>'.format(protocol)]
+
+        if protocol in ('TCP', 'UDP'):
+            from_port = rnd.choice([22, 80, 443, 3306, 8080])
+            elements.append('<fromPort>{}</fromPort>'.format(from_port))
+            if rnd.random() < 0.3:
+                elements.append('<toPort>{}</toPort>'.format(from_port + 100))
+
+        elements.append('<inOut>{}</inOut>'.format(rnd.choice(['IN', 'OUT'])))
+
+        if rnd.random() < 0.2:
+            elements.append('<groups><item><groupName>bench{:06d}</groupName></item></groups>'.format(rnd.randrange(group_index + 1)))
+        else:
+            elements.append('<ipRanges><item><cidrIp>10.{}.{}.0/24</cidrIp></item></ipRanges>'.format(rnd.randrange(256), rnd.randrange(256)))
+
+        if rnd.random() < 0.5:
+            elements.append('<description>rule {}</description>'.format(rnd.randrange(1000)))
+
+        return '<item>{}</item>'.format(''.join(elements))
+
+
+class FakeNifcloudAdapter(BaseAdapter):
+    # transport adapter of requests answering requests to NIFCLOUD endpoints by the fake api,
+    # so that requests are signed and sent through sessions of connections as the real ones
+
+    def __init__(self, api):
+        super(FakeNifcloudAdapter, self).__init__()
+        self.api = api
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlparse(request.url)
+        params = parse_qs(request.body if request.body is not None else url.query)
+        region_name = url.hostname.split('.')[1]
+
+        response = requests.Response()
+        response.status_code = 200
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response._content = self.api.respond(region_name, params['Action'][0], params).encode('utf-8')
+
+        return response
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def serve(api):
+    # sessions created in the context send requests to the fake api
+    adapter = FakeNifcloudAdapter(api)
+
+    with mock.patch.object(requests.Session, 'get_adapter', lambda session, url: adapter):
+        yield adapter
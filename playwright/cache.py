@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+# refresh ignores responses cached before the run, responses cached in the run are shared by the configs
+_RUN_STARTED = time.time()
+
+
+class ResponseCache():
+    # stores each describe response as a json file named by the hash of its key
+
+    DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'playwright')
+    DEFAULT_TTL = 600
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    @classmethod
+    def from_config(cls, config, refresh=False):
+        # playbooks from cached responses would purge rules changed since they were cached, so the cache is used only if cache_ttl is set
+        cache_ttl = config.get_option('cache_ttl', None)
+        if cache_ttl is None:
+            return None
+
+        cache_dir = config.get_option('cache_dir', cls.DEFAULT_DIR)
+        cache_dir = os.path.join(config.base_dir, os.path.expanduser(cache_dir))
+
+        return cls(
+                cache_dir,
+                ttl=int(cache_ttl),
+                max_size=int(config.get_option('cache_max_size', cls.DEFAULT_MAX_SIZE)),
+                refresh=refresh)
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, refresh=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self.refresh = refresh
+
+    def with_ttl(self, ttl):
+        return ResponseCache(self.cache_dir, ttl=ttl, max_size=self.max_size, refresh=self.refresh)
+
+    def fetch(self, key, load):
+        path = self._generate_path(key)
+
+        entry = self._read_entry(path)
+        if entry is not None:
+            return entry['response']
+
+        response = load()
+        self._write_entry(path, {'created': time.time(), 'response': response})
+        self._evict()
+
+        return response
+
+    def _generate_path(self, key):
+        content = json.dumps(key, sort_keys=True)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, '{}.json'.format(digest))
+
+    def _read_entry(self, path):
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry['created'] > self.ttl:
+            self._remove(path)
+            return None
+
+        if self.refresh and entry['created'] < _RUN_STARTED:
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass  # evicted by another run or thread after read
+
+        return entry
+
+    def _write_entry(self, path, entry):
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        entries = []
+        for path in self._list_entry_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def _list_entry_paths(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MemoryResponseCache():
+    # keeps describe responses in memory until cleared, used by long running commands between regenerations
+
+    def __init__(self):
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def with_ttl(self, ttl):
+        # responses are kept until cleared regardless of ttl
+        return self
+
+    def fetch(self, key, load):
+        digest = json.dumps(key, sort_keys=True)
+
+        with self._lock:
+            if digest in self._responses:
+                return self._responses[digest]
+
+        response = load()
+
+        with self._lock:
+            self._responses[digest] = response
+
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
@@ -1,10 +1,20 @@
+import contextlib
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import click
 
 from playwright import __version__
-from playwright.config import PlaywrightConfig
-from playwright.error import PlaywrightUnsupportedError
-from playwright.inspired import InspiredPlaybook
-from playwright.playhouse.nifcloud import NifcloudPlayhouse
+from playwright.cache import MemoryResponseCache, ResponseCache
+from playwright.incremental import IncrementalRenderer
+from playwright.profiler import enable_profiler, get_profiler
+from playwright.registry import PlayhouseFactory, RENDER_BACKENDS, SPLIT_MODES
+
+# config and inspired (yaml, jinja2) are imported in commands using them,
+# and playhouses (sleety) are imported by the registry when inspirations use them,
+# so that commands such as version start without loading them
 
 
 @click.group()
@@ -14,38 +24,401 @@ def cli():
 
 @cli.command()
 @click.option('--output-file', '-f', default=False, is_flag=True, help='output to file')
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help='number of inspirations inspired in parallel')
+@click.option('--no-cache', default=False, is_flag=True, help='do not use cached describe responses')
+@click.option('--refresh', default=False, is_flag=True, help='ignore cached describe responses and cache new ones')
+@click.option('--from-snapshot', default=False, is_flag=True, help='inspire from snapshot_path without calling describe API')
+@click.option('--stream', default=False, is_flag=True, help='write playbook while tasks are generated')
+@click.option('--incremental', default=False, is_flag=True, help='re-render only tasks changed since previous output (requires -f)')
+@click.option('--split', type=click.Choice(SPLIT_MODES), help='output tasks into files of each region or group imported by the playbook (requires -f)')
+@click.option('--render-backend', default='template', type=click.Choice(RENDER_BACKENDS), help='render tasks with templates or native emitters')
+@click.option('--render-workers', default=1, type=click.IntRange(min=1), help='number of processes rendering tasks')
+@click.option('--profile', default=False, is_flag=True, help='print time of each stage to stderr')
+@click.option('--profile-trace', type=click.Path(), help='write time of each stage as chrome trace json')
 @click.argument('inspiration_path', type=click.Path(exists=True))
-def inspire(output_file, inspiration_path):
-    config = PlaywrightConfig()
-    config.load_file(inspiration_path)
+def inspire(output_file, jobs, no_cache, refresh, from_snapshot, stream, incremental, split, render_backend, render_workers,
+            profile, profile_trace, inspiration_path):
+    from playwright.config import PlaywrightConfig
+    from playwright.inspired import InspiredPlaybook, init_template_environment
 
-    playbook = InspiredPlaybook(config)
+    if incremental and not output_file:
+        raise click.UsageError('--incremental requires --output-file')
 
-    for inspiration in config.inspirations:
-        if inspiration['playhouse'] == 'nifcloud':
-            playhouse = NifcloudPlayhouse()
-            playhouse.init(config, inspiration)
-            inspired = playhouse.inspire()
-            playbook.append_inspired(inspired)
-        else:
-            raise PlaywrightUnsupportedError('unsuppouted playhouse: {}'.format(inspiration['playhouse']))
+    if split and not output_file:
+        raise click.UsageError('--split requires --output-file')
 
-    _output_playbook(playbook, output_file)
+    if split and stream:
+        raise click.UsageError('--split can not be used with --stream')
 
+    profiler = enable_profiler() if profile or profile_trace else get_profiler()
 
-def _output_playbook(playbook, output_to_file=False):
-    playbook_content = playbook.render()
+    with profiler.span('load_config'):
+        config = PlaywrightConfig()
+        config.load_file(inspiration_path)
 
-    if not output_to_file:
-        click.echo(playbook_content)
+    response_cache = None if no_cache else ResponseCache.from_config(config, refresh=refresh)
+
+    template_cache_dir = config.get_option('template_cache_dir')
+    if template_cache_dir:
+        template_cache_dir = os.path.join(config.base_dir, os.path.expanduser(template_cache_dir))
+        init_template_environment(template_cache_dir)
+
+    with _create_render_pool(render_workers, template_cache_dir) as render_pool:
+        playbook = InspiredPlaybook(config, render_backend=render_backend, render_pool=render_pool)
+        failures = []
+
+        if incremental:
+            state_path = IncrementalRenderer.generate_state_path(playbook.generate_output_path())
+            playbook.node_renderer = IncrementalRenderer(state_path)
+
+        playhouses = _init_playhouses(config, jobs, PlayhouseFactory(), response_cache, _generate_playhouse_options(from_snapshot))
+        _append_inspired(playbook, playhouses, jobs, stream, failures)
+
+        with profiler.span('output_playbook'):
+            output_path = _output_playbook(playbook, failures, output_file, stream, split)
+
+    if output_path:
+        click.echo(output_path)
+
+    if profile:
+        click.echo(profiler.generate_summary(), err=True)
+
+    if profile_trace:
+        profiler.write_chrome_trace(profile_trace)
+
+    if incremental:
+        _report_incremental(playbook.node_renderer, failures)
+
+    if failures:
+        raise click.ClickException('{} inspiration(s) failed'.format(len(failures)))
+
+
+@cli.command()
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help='number of inspiration configs inspired in parallel')
+@click.option('--no-cache', default=False, is_flag=True, help='do not use cached describe responses')
+@click.option('--refresh', default=False, is_flag=True, help='ignore cached describe responses and cache new ones')
+@click.option('--from-snapshot', default=False, is_flag=True, help='inspire from snapshot_path without calling describe API')
+@click.option('--render-backend', default='template', type=click.Choice(RENDER_BACKENDS), help='render tasks with templates or native emitters')
+@click.option('--render-workers', default=1, type=click.IntRange(min=1), help='number of processes rendering tasks of all configs')
+@click.option('--split', type=click.Choice(SPLIT_MODES), help='output tasks into files of each region or group imported by the playbook')
+@click.argument('inspiration_paths', nargs=-1, required=True)
+def batch(jobs, no_cache, refresh, from_snapshot, render_backend, render_workers, split, inspiration_paths):
+    from playwright.inspired import InspiredPlaybook
+
+    configs, failures = _load_configs(_expand_inspiration_paths(inspiration_paths))
+
+    if not configs and not failures:
+        raise click.UsageError('inspiration config not found: {}'.format(' '.join(inspiration_paths)))
+
+    output_paths = {}
+    for config in configs:
+        output_path = InspiredPlaybook(config).generate_output_path()
+        if output_path in output_paths:
+            raise click.UsageError('{} and {} output the same playbook: {}'.format(output_paths[output_path], config.config_path, output_path))
+        output_paths[output_path] = config.config_path
+
+    # playhouses of all configs share region discovery, connections and describe requests
+    playhouse_factory = PlayhouseFactory()
+    playhouse_options = _generate_playhouse_options(from_snapshot)
+
+    with _create_render_pool(render_workers) as render_pool, ThreadPoolExecutor(max_workers=jobs) as executor:
+        # playhouses of all configs are initialized before inspiring, so that later configs share responses described for earlier ones
+        init_jobs = [executor.submit(_batch_init, config, no_cache, refresh, playhouse_factory, playhouse_options) for config in configs]
+        wait(init_jobs)
+
+        batch_jobs = [
+            executor.submit(_batch_inspire, config, init_job, render_backend, render_pool, split)
+            for config, init_job in zip(configs, init_jobs)
+        ]
+
+        for config, batch_job in zip(configs, batch_jobs):
+            error = batch_job.exception()
+            if error:
+                _report_failure(config.config_path, error, failures)
+                continue
+
+            output_path, inspire_failures = batch_job.result()
+            if output_path:
+                click.echo(output_path)
+            if inspire_failures:
+                failures.append(config.config_path)
+
+    if failures:
+        raise click.ClickException('{} inspiration config(s) failed'.format(len(failures)))
+
+
+@cli.command()
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help='number of inspirations of a config inspired in parallel')
+@click.option('--interval', default=300.0, type=click.FloatRange(min=0), help='seconds between describing resources again')
+@click.option('--poll-interval', default=0.5, type=click.FloatRange(min=0.01), help='seconds between checking changes of inspiration configs and vars files')
+@click.option('--render-backend', default='template', type=click.Choice(RENDER_BACKENDS), help='render tasks with templates or native emitters')
+@click.argument('inspiration_paths', nargs=-1, required=True)
+def watch(jobs, interval, poll_interval, render_backend, inspiration_paths):
+    from playwright.watch import WatchedConfig
+
+    # configs, templates and describe responses are kept in memory,
+    # so that a changed config is regenerated without describing resources again
+    response_cache = MemoryResponseCache()
+    watched_configs = {}
+    described = None
+
+    while True:
+        redescribe = described is None or time.monotonic() - described >= interval
+        if redescribe:
+            described = time.monotonic()
+            response_cache.clear()
+            # regions are also discovered again
+            playhouse_factory = PlayhouseFactory()
+
+        inspiration_paths_now = _expand_inspiration_paths(inspiration_paths)
+        for removed_path in set(watched_configs) - set(inspiration_paths_now):
+            del watched_configs[removed_path]
+
+        for inspiration_path in inspiration_paths_now:
+            watched_config = watched_configs.setdefault(inspiration_path, WatchedConfig(inspiration_path))
+            changed = watched_config.is_changed()
+
+            if changed:
+                try:
+                    watched_config.load()
+                except Exception as error:  # noqa: B902
+                    _report_failure(inspiration_path, error, [])
+                    continue
+
+            if watched_config.config and (changed or redescribe):
+                _watch_inspire(watched_config, jobs, playhouse_factory, response_cache, render_backend)
+
+        time.sleep(poll_interval)
+
+
+def _watch_inspire(watched_config, jobs, playhouse_factory, response_cache, render_backend):
+    from playwright import writer
+    from playwright.inspired import InspiredPlaybook
+
+    config = watched_config.config
+    playbook = InspiredPlaybook(config, render_backend=render_backend)
+    failures = []
+
+    try:
+        playhouses = _init_playhouses(config, jobs, playhouse_factory, response_cache, name_prefix='{}: '.format(config.config_path))
+        _append_inspired(playbook, playhouses, jobs, False, failures)
+        renderd = playbook.render()
+    except Exception as error:  # noqa: B902
+        _report_failure(config.config_path, error, failures)
+
+    # keeps the last playbook rather than writing one missing tasks of failed inspirations
+    if failures or renderd == watched_config.playbook:
         return
 
+    # replaced atomically, so that a playbook being run is not read half written
     output_path = playbook.generate_output_path()
-    with open(output_path, "w") as file:
-        file.write(playbook_content)
+    written = writer.write_file(output_path, renderd)
+
+    watched_config.playbook = renderd
+    if written:
         click.echo(output_path)
 
 
+def _expand_inspiration_paths(inspiration_paths):
+    # each path is an inspiration config, a directory of *.insp.yml or a glob pattern
+    expanded_paths = []
+
+    for inspiration_path in inspiration_paths:
+        if os.path.isdir(inspiration_path):
+            expanded_paths.extend(sorted(glob.glob(os.path.join(inspiration_path, '*.insp.yml'))))
+        elif glob.has_magic(inspiration_path):
+            expanded_paths.extend(sorted(glob.glob(inspiration_path, recursive=True)))
+        else:
+            expanded_paths.append(inspiration_path)
+
+    return list(dict.fromkeys(os.path.abspath(path) for path in expanded_paths))
+
+
+def _load_configs(inspiration_paths):
+    from playwright.config import PlaywrightConfig
+
+    configs = []
+    failures = []
+
+    for inspiration_path in inspiration_paths:
+        try:
+            config = PlaywrightConfig()
+            config.load_file(inspiration_path)
+        except Exception as error:  # noqa: B902
+            _report_failure(inspiration_path, error, failures)
+            continue
+
+        configs.append(config)
+
+    return configs, failures
+
+
+def _batch_init(config, no_cache, refresh, playhouse_factory, playhouse_options):
+    response_cache = None if no_cache else ResponseCache.from_config(config, refresh=refresh)
+
+    return _init_playhouses(config, 1, playhouse_factory, response_cache, playhouse_options, name_prefix='{}: '.format(config.config_path))
+
+
+def _batch_inspire(config, init_job, render_backend, render_pool, split):
+    from playwright.inspired import InspiredPlaybook
+
+    playhouses = init_job.result()
+
+    playbook = InspiredPlaybook(config, render_backend=render_backend, render_pool=render_pool)
+    failures = []
+
+    _append_inspired(playbook, playhouses, 1, False, failures)
+
+    return _output_playbook(playbook, failures, output_to_file=True, split=split), failures
+
+
+def _create_render_pool(render_workers, bytecode_cache_dir=None):
+    if render_workers <= 1:
+        return _no_render_pool()
+
+    from playwright.render_pool import RenderPool
+
+    return RenderPool(render_workers, bytecode_cache_dir)
+
+
+@contextlib.contextmanager
+def _no_render_pool():
+    yield None
+
+
+def _generate_playhouse_options(from_snapshot):
+    # options only given when they are set, so that playhouses not supporting them work as before
+    return {'from_snapshot': True} if from_snapshot else {}
+
+
+def _init_playhouses(config, jobs, playhouse_factory, response_cache=None, playhouse_options=None, name_prefix=''):
+    # returns [(name, job initializing playhouse)] of inspirations.
+    # all playhouses are initialized before inspiring, so that responses of describe requests declared by later inspirations are kept for them
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        init_jobs = [
+            executor.submit(_init_playhouse, config, inspiration, playhouse_factory, response_cache, 'inspiration[{}]'.format(index), playhouse_options)
+            for index, inspiration in enumerate(config.inspirations)
+        ]
+
+    return [('{}inspiration[{}]'.format(name_prefix, index), init_job) for index, init_job in enumerate(init_jobs)]
+
+
+def _append_inspired(playbook, playhouses, jobs, stream, failures):
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        inspire_jobs = [executor.submit(_inspire, init_job, stream) for _, init_job in playhouses]
+
+        # append in the order of inspirations, whichever job finishes first
+        for (name, _), inspire_job in zip(playhouses, inspire_jobs):
+            error = inspire_job.exception()
+            if error:
+                _report_failure(name, error, failures)
+                continue
+
+            inspired = inspire_job.result()
+            if stream:
+                inspired.tasks = _isolate_failure(name, inspired.tasks, failures)
+
+            playbook.append_inspired(inspired)
+
+
+def _init_playhouse(config, inspiration, playhouse_factory, response_cache=None, name=None, playhouse_options=None):
+    playhouse = playhouse_factory.create(inspiration['playhouse'], response_cache=response_cache, name=name, **(playhouse_options or {}))
+
+    with get_profiler().span('init', inspiration=name):
+        playhouse.init(config, inspiration)
+
+    return playhouse
+
+
+def _inspire(init_job, lazy=False):
+    # failures of initialization are reported as failures of inspiring
+    playhouse = init_job.result()
+
+    with get_profiler().span('inspire', inspiration=playhouse.name):
+        return playhouse.inspire(lazy=lazy)
+
+
+def _isolate_failure(name, tasks, failures):
+    # lazy tasks fail while the playbook is written, the rest of playbook is still written
+    try:
+        yield from tasks
+    except Exception as error:  # noqa: B902
+        _report_failure(name, error, failures)
+
+
+def _report_failure(name, error, failures):
+    click.echo('{} failed: {!r}'.format(name, error), err=True)
+    failures.append(name)
+
+
+def _report_incremental(renderer, failures):
+    click.echo('unchanged: {}, changed: {}, added: {}, removed: {}'.format(
+        len(renderer.unchanged), len(renderer.changed), len(renderer.added), len(renderer.removed)), err=True)
+
+    for label, keys in (('changed', renderer.changed), ('added', renderer.added), ('removed', renderer.removed)):
+        for key in keys:
+            click.echo('  {}: {}'.format(label, key), err=True)
+
+    # tasks of failed inspirations are missing, so keep the previous state
+    if not failures:
+        renderer.save()
+
+
+def _output_playbook(playbook, failures, output_to_file=False, stream=False, split=None):
+    from playwright import writer
+
+    if not output_to_file:
+        # click.echo flushes each chunk, so streamed tasks reach a pipe as they are rendered
+        for chunk in _generate_playbook_chunks(playbook, stream):
+            click.echo(chunk, nl=False)
+        click.echo()
+        return None
+
+    # tasks of failed inspirations are missing, so the previous playbook is kept
+    output_path = playbook.generate_output_path()
+    if failures:
+        return _report_not_written(output_path)
+
+    if split:
+        return _output_split_playbook(playbook, split)
+
+    # streamed tasks may fail while they are written
+    if not writer.write_chunks(output_path, _generate_playbook_chunks(playbook, stream), lambda: not failures):
+        return _report_not_written(output_path)
+
+    return output_path
+
+
+def _generate_playbook_chunks(playbook, stream):
+    return playbook.generate() if stream else [playbook.render()]
+
+
+def _report_not_written(output_path):
+    click.echo('{}: not written since inspiration(s) failed'.format(output_path), err=True)
+    return None
+
+
+def _output_split_playbook(playbook, split):
+    from playwright import writer
+
+    output_path = playbook.generate_output_path()
+    renderd, task_files = playbook.render_split(split)
+
+    playbook_dir = os.path.dirname(output_path)
+    task_paths = [os.path.join(playbook_dir, path) for path in task_files]
+
+    # task files are written before the playbook importing them, and stale ones are removed after it
+    written_paths = writer.write_files(dict(zip(task_paths, task_files.values())))
+    if writer.write_file(output_path, renderd):
+        written_paths.append(output_path)
+    removed_paths = writer.remove_stale_files(os.path.join(playbook_dir, playbook.generate_tasks_dir()), task_paths)
+
+    click.echo('{}: written: {}, unchanged: {}, removed: {}'.format(
+        output_path, len(written_paths), len(task_paths) + 1 - len(written_paths), len(removed_paths)), err=True)
+
+    return output_path
+
+
 @cli.command()
 def version():
     click.echo(__version__)
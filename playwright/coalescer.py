@@ -0,0 +1,61 @@
+import collections
+import json
+import threading
+from concurrent.futures import Future
+
+
+class RequestCoalescer():
+    # identical requests share one call and its result.
+    # a result is kept while consumers declared by expect() have not released it, other results are shared only by requests in flight
+
+    def __init__(self):
+        self._futures = {}
+        self._expected = collections.Counter()
+        self._lock = threading.Lock()
+
+    def expect(self, key):
+        # a declared consumer releases the key after fetching it, or when it will not fetch it
+        with self._lock:
+            self._expected[self._generate_digest(key)] += 1
+
+    def release(self, key):
+        digest = self._generate_digest(key)
+
+        with self._lock:
+            self._expected[digest] -= 1
+            if self._expected[digest] > 0:
+                return
+
+            del self._expected[digest]
+
+            future = self._futures.get(digest)
+            if future is not None and future.done():
+                del self._futures[digest]
+
+    def fetch(self, key, load):
+        # returns (response, whether the response was shared)
+        digest = self._generate_digest(key)
+
+        with self._lock:
+            future = self._futures.get(digest)
+            shared = future is not None
+
+            if not shared:
+                future = Future()
+                self._futures[digest] = future
+
+        if not shared:
+            try:
+                future.set_result(load())
+            except BaseException as error:  # noqa: B902
+                future.set_exception(error)
+
+            with self._lock:
+                # failed calls are not kept, so that later requests call again
+                if digest not in self._expected or future.exception() is not None:
+                    del self._futures[digest]
+
+        return future.result(), shared
+
+    def _generate_digest(self, key):
+        return json.dumps(key, sort_keys=True)
@@ -1,7 +1,7 @@
 import copy
 import os
 
-import yaml
+from playwright import yaml_backend
 
 
 class PlaywrightConfig:
@@ -20,7 +20,7 @@ class PlaywrightConfig:
         self._base_dir = os.path.dirname(os.path.abspath(file_path))
 
         with open(file_path, 'r') as config_file:
-            content = yaml.load(config_file)
+            content = yaml_backend.load(config_file)
 
             # TODO: validate yaml
 
@@ -43,7 +43,7 @@ class PlaywrightConfig:
             vars_file_path = os.path.join(self.playbooks_dir, vars_file)
 
             with open(vars_file_path, 'r') as f:
-                content = yaml.load(f)
+                content = yaml_backend.load(f)
                 expand_vars.update(content)
 
         return expand_vars
@@ -80,5 +80,5 @@ class PlaywrightConfig:
     def expand_vars(self):
         return self._expand_vars
 
-    def get_option(self, key):
-        return self._playwright_options[key] if key in self._playwright_options else ''
+    def get_option(self, key, default=''):
+        return self._playwright_options[key] if key in self._playwright_options else default
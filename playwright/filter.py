@@ -0,0 +1,128 @@
+import re
+
+from playwright.error import PlaywrightUnsupportedError
+
+
+# backreferences are numbered per pattern, and inline flags such as (?i) apply to all combined patterns on python <= 3.10,
+# so patterns using them are not combined
+_UNCOMBINABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?[aiLmsux-]')
+
+
+class ResourceFilter():
+
+    @classmethod
+    def from_config(cls, module_config):
+        includes = module_config['includes'] if 'includes' in module_config else None
+        excludes = module_config['excludes'] if 'excludes' in module_config else None
+
+        return cls(includes, excludes)
+
+    def __init__(self, includes=None, excludes=None):
+        self._includes = _FilterRules('include', includes) if includes is not None else None
+        self._excludes = _FilterRules('exclude', excludes) if excludes is not None else None
+
+    def is_target(self, resource):
+        return self.is_include(resource) and not self.is_exclude(resource)
+
+    def is_include(self, resource):
+        if self._includes is None:
+            return True
+
+        return self._includes.match(resource)
+
+    def is_exclude(self, resource):
+        if self._excludes is None:
+            return False
+
+        return self._excludes.match(resource)
+
+    def filter(self, resources):
+        for resource in resources:
+            if self.is_target(resource):
+                yield resource
+
+
+class _FilterRules():
+
+    def __init__(self, name, rules):
+        self._name = name
+
+        regexps_by_key = {}
+        for rule in rules:
+            regexps_by_key.setdefault(rule['key'], []).append(rule['regexp'])
+
+        self._matchers = [(_KeyPath(key), self._compile(regexps)) for key, regexps in regexps_by_key.items()]
+
+    def match(self, resource):
+        for key_path, patterns in self._matchers:
+            for value in key_path.extract(resource):
+                text = self._to_str(value)
+
+                for pattern in patterns:
+                    if pattern.search(text):
+                        return True
+
+        return False
+
+    def _compile(self, regexps):
+        patterns = [re.compile(regexp) for regexp in regexps]
+
+        combinable_regexps = [regexp for regexp in regexps if not _UNCOMBINABLE.search(regexp)]
+        if len(combinable_regexps) < 2:
+            return patterns
+
+        try:
+            combined_pattern = re.compile('|'.join('(?:{})'.format(regexp) for regexp in combinable_regexps))
+        except re.error:
+            # e.g. duplicated group names can not be combined
+            return patterns
+
+        return [combined_pattern] + [pattern for regexp, pattern in zip(regexps, patterns) if _UNCOMBINABLE.search(regexp)]
+
+    def _to_str(self, value):
+        if isinstance(value, str):
+            return value
+        elif isinstance(value, bool):
+            return 'true' if value else 'false'
+        elif isinstance(value, (int, float)):
+            return str(value)
+
+        raise PlaywrightUnsupportedError('{} supports only scalar value: {}'.format(self._name, type(value).__name__))
+
+
+class _KeyPath():
+    # key such as "ipPermissions[].ipRanges[].cidrIp", "[]" iterates items of list
+
+    def __init__(self, key):
+        self._segments = []
+
+        for segment in key.split('.'):
+            is_list = segment.endswith('[]')
+            name = segment[:-2] if is_list else segment
+            self._segments.append((name, is_list))
+
+    def extract(self, resource):
+        values = [resource]
+
+        for name, is_list in self._segments:
+            values = self._extract_segment(values, name, is_list)
+
+        return values
+
+    def _extract_segment(self, values, name, is_list):
+        extracted = []
+
+        for value in values:
+            if not isinstance(value, dict) or name not in value:
+                continue
+
+            item = value[name]
+
+            if not is_list:
+                extracted.append(item)
+            elif isinstance(item, list):
+                extracted.extend(item)
+            elif item is not None:
+                extracted.append(item)
+
+        return extracted
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from playwright import __version__
+
+
+class IncrementalRenderer():
+    # reuses rendered text of nodes whose content is unchanged since the previous output
+
+    @classmethod
+    def generate_state_path(cls, playbook_path):
+        dirname, filename = os.path.split(playbook_path)
+        return os.path.join(dirname, '.{}.inspired.json'.format(filename))
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+
+        self._previous = self._load()
+        self._current = {}
+
+    def render(self, node, backend='template'):
+        return self.render_nodes([node], backend)[0]
+
+    def render_nodes(self, nodes, backend='template', render_nodes=None):
+        # nodes not found in the previous output are rendered at once by render_nodes, e.g. in worker processes
+        renders = [None] * len(nodes)
+        digests = {}
+        render_indexes = []
+
+        for index, node in enumerate(nodes):
+            if not node.key:
+                render_indexes.append(index)
+                continue
+
+            digest = self._hash(node)
+            previous = self._previous.get(node.key, {})
+            digests[index] = digest
+
+            if digest in previous:
+                renders[index] = previous[digest]
+                self.unchanged.append(node.key)
+            else:
+                render_indexes.append(index)
+                (self.changed if previous else self.added).append(node.key)
+
+        render_targets = [nodes[index] for index in render_indexes]
+        if render_nodes:
+            renderd_targets = render_nodes(render_targets, backend)
+        else:
+            renderd_targets = [node.render(backend) for node in render_targets]
+
+        for index, renderd in zip(render_indexes, renderd_targets):
+            renders[index] = renderd
+
+        # same key may be inspired more than once, e.g. by modules sharing resources
+        for index, digest in digests.items():
+            self._current.setdefault(nodes[index].key, {})[digest] = renders[index]
+
+        return renders
+
+    @property
+    def removed(self):
+        return sorted(set(self._previous) - set(self._current))
+
+    def save(self):
+        state = {'version': __version__, 'nodes': self._current}
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+
+        os.replace(tmp_path, self.state_path)
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        # rendering may change between versions
+        if state.get('version') != __version__:
+            return {}
+
+        return state['nodes']
+
+    def _hash(self, node):
+        content = json.dumps([node.template, node.content], default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
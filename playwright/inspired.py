@@ -1,51 +1,166 @@
+import io
+import itertools
 import os
 import re
+import threading
+from collections import OrderedDict
 
-from future.moves.collections import OrderedDict
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
 
-from jinja2 import Environment, PackageLoader
+from playwright import yaml_backend
+from playwright.profiler import get_profiler
 
-import yaml
 
+def _dump_yaml(instance, default_flow_style=False, allow_unicode=True, width=yaml_backend.UNLIMITED_WIDTH):
+    with get_profiler().span('dump_yaml', trace=False):
+        return yaml_backend.dump(instance, default_flow_style=default_flow_style, allow_unicode=allow_unicode, width=width)
 
-def _represent_odict(dumper, instance):
-    return dumper.represent_mapping(u'tag:yaml.org,2002:map', instance.items())
 
+def _indent_chunks(chunks, width):
+    # same as jinja2 indent filter applied to the rest of an already indented line
+    indention = ' ' * width
+    at_line_start = False
 
-def _represent_str(dumper, instance):
-    # string variable quotes double quotation
-    if instance.startswith('{{') and instance.endswith('}}'):
-        return dumper.represent_scalar('tag:yaml.org,2002:str', instance, style='"')
-    else:
-        return dumper.represent_scalar('tag:yaml.org,2002:str', instance)
+    for chunk in chunks:
+        for line in chunk.splitlines(True):
+            content = line.splitlines()[0]
 
+            indented = indention + content if at_line_start and content else content
 
-yaml.add_representer(OrderedDict, _represent_odict)
-yaml.add_representer(str, _represent_str)
+            at_line_start = content != line
+            yield indented + '\n' if at_line_start else indented
 
 
-def _dump_yaml(instance, default_flow_style=False, allow_unicode=True, width=float('inf')):
-    return yaml.dump(instance, default_flow_style=default_flow_style, allow_unicode=allow_unicode, width=width)
+_TASKS_PLACEHOLDER = '\x00tasks\x00'
+
+_TASK_FILE_HEADER = '---\n\n# This file generated by playwright.\n\n'
+
+# a leading dot is also replaced not to make hidden files nor refer parent directories
+_UNSAFE_PATH_CHARS = re.compile(r'^\.|[^A-Za-z0-9_.-]')
+
+_template_environment = None
+_template_environment_lock = threading.Lock()
+
+
+def init_template_environment(bytecode_cache_dir=None):
+    global _template_environment
+
+    bytecode_cache = None
+    if bytecode_cache_dir:
+        os.makedirs(bytecode_cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+
+    # templates are packaged, so compiled templates are kept without checking updates
+    env = Environment(loader=PackageLoader('playwright', 'templates'), bytecode_cache=bytecode_cache, auto_reload=False)
+    env.filters['dump_yaml'] = _dump_yaml
+
+    _template_environment = env
+    return env
+
+
+def get_template_environment():
+    if _template_environment is None:
+        with _template_environment_lock:
+            if _template_environment is None:
+                init_template_environment()
+
+    return _template_environment
 
 
 class InspiredPlaybook():
-    def __init__(self, config):
+    def __init__(self, config, node_renderer=None, render_backend='template', render_pool=None):
         self.config = config
         self.inspired_list = []
+        self.node_renderer = node_renderer
+        self.render_backend = render_backend
+        self.render_pool = render_pool
 
     def append_inspired(self, inspired):
         self.inspired_list.append(inspired)
 
     def render(self):
-        env = Environment(loader=PackageLoader('playwright', 'templates'))
-        env.filters['dump_yaml'] = _dump_yaml
+        vars_groups, roles_groups = self._render_vars_and_roles_groups()
+
+        tasks_groups = []
+
+        for inspired in self.inspired_list:
+            task_group = os.linesep.join(self._generate_task_renders(inspired.tasks))
+            if task_group:
+                tasks_groups.append(task_group)
+
+        return self._render_playbook(vars_groups, roles_groups, tasks_groups)
+
+    def generate(self):
+        # yields the same content as render() chunk by chunk, rendering tasks as they are produced
+        vars_groups, roles_groups = self._render_vars_and_roles_groups()
+
+        tasks_chunks = self._generate_tasks_chunks()
+
+        for first_chunk in tasks_chunks:
+            if first_chunk:
+                break
+        else:
+            yield self._render_playbook(vars_groups, roles_groups, [])
+            return
+
+        renderd = self._render_playbook(vars_groups, roles_groups, [_TASKS_PLACEHOLDER])
+        head, tail = renderd.split(_TASKS_PLACEHOLDER)
+
+        yield head
+        yield from _indent_chunks(itertools.chain([first_chunk], tasks_chunks), 4)
+        yield tail
+
+    def render_split(self, split):
+        # returns the root playbook importing task files, and {path relative to playbooks_dir: content} of the task files.
+        # tasks are sharded by region or group of their keys, and imported in the same order as render()
+        vars_groups, roles_groups = self._render_vars_and_roles_groups()
+
+        tasks_dir = self.generate_tasks_dir()
+        task_files = OrderedDict()
+        tasks_groups = []
 
+        for index, inspired in enumerate(self.inspired_list):
+            tasks = list(inspired.tasks)
+            entries = []
+            previous_shard = None
+            path = None
+
+            for task, renderd in zip(tasks, self._generate_task_renders(tasks)):
+                shard = _generate_shard(task.key, split)
+                if shard is None:
+                    # tasks without key stay in the root playbook
+                    entries.append(renderd)
+                    previous_shard = None
+                    continue
+
+                if shard != previous_shard:
+                    # a shard appearing again after other shards gets another file, not to change the order of tasks
+                    path = _generate_unique_path('{}/{}/{}.yml'.format(tasks_dir, index, shard), task_files)
+                    task_files[path] = []
+                    entries.append(yaml_backend.dump([OrderedDict((('import_tasks', path),))]))
+
+                task_files[path].append(renderd)
+                previous_shard = shard
+
+            task_group = os.linesep.join(entries)
+            if task_group:
+                tasks_groups.append(task_group)
+
+        renderd = self._render_playbook(vars_groups, roles_groups, tasks_groups)
+        task_files = OrderedDict((path, _TASK_FILE_HEADER + os.linesep.join(renders)) for path, renders in task_files.items())
+
+        return renderd, task_files
+
+    def generate_tasks_dir(self):
+        playbook_filename = os.path.basename(self.generate_output_path())
+        return '{}.tasks'.format(os.path.splitext(playbook_filename)[0])
+
+    def _render_vars_and_roles_groups(self):
         vars_groups = []
         roles_groups = []
-        tasks_groups = []
 
         if self.config.vars:
-            vars_group = yaml.dump(self.config.vars, default_flow_style=False, allow_unicode=True)
+            vars_group = yaml_backend.dump(self.config.vars, default_flow_style=False, allow_unicode=True)
             vars_groups.append(vars_group)
 
         for inspired in self.inspired_list:
@@ -57,21 +172,39 @@ class InspiredPlaybook():
             if role_group:
                 roles_groups.append(role_group)
 
-            task_group = self._render_nodes(inspired.tasks)
-            if task_group:
-                tasks_groups.append(task_group)
+        return vars_groups, roles_groups
 
-        template = env.get_template('default.playbook.yml.j2')
-        renderd = template.render(
-                playwright_options=self.config.playwright_options,
-                vars_groups=vars_groups,
-                vars_files=self.config.vars_files,
-                roles_groups=roles_groups,
-                tasks_groups=tasks_groups,
-        )
+    def _render_playbook(self, vars_groups, roles_groups, tasks_groups):
+        template = get_template_environment().get_template('default.playbook.yml.j2')
+
+        with get_profiler().span('render_playbook'):
+            renderd = template.render(
+                    playwright_options=self.config.playwright_options,
+                    vars_groups=vars_groups,
+                    vars_files=self.config.vars_files,
+                    roles_groups=roles_groups,
+                    tasks_groups=tasks_groups,
+            )
 
         return renderd
 
+    def _generate_tasks_chunks(self):
+        # concatenation of chunks equals concatenation of tasks_groups in render()
+        for inspired in self.inspired_list:
+            for index, renderd in enumerate(self._generate_task_renders(inspired.tasks)):
+                if index:
+                    yield os.linesep
+                yield renderd
+
+    def _generate_task_renders(self, tasks):
+        if not self.render_pool:
+            for task in tasks:
+                yield self._render_node(task)
+            return
+
+        # tasks are rendered by worker processes in batches, and yielded in the same order
+        yield from self.render_pool.generate_renders(tasks, self.render_backend, self.node_renderer)
+
     def generate_output_path(self):
         playbook_filename = self.config.get_option('playbook_filename')
         if not playbook_filename:
@@ -83,9 +216,39 @@ class InspiredPlaybook():
         return playbook_path
 
     def _render_nodes(self, nodes):
-        renders = [task.render() for task in nodes]
+        renders = [self._render_node(task) for task in nodes]
         return os.linesep.join(renders)
 
+    def _render_node(self, node):
+        with get_profiler().span('render_node', trace=False, template=node.template):
+            if self.node_renderer:
+                return self.node_renderer.render(node, self.render_backend)
+
+            return node.render(self.render_backend)
+
+
+def _generate_shard(key, split):
+    # keys are "<region>/<group>/<kind>" or "<region>/<kind>" for tasks of a whole region
+    if not key:
+        return None
+
+    segments = [_UNSAFE_PATH_CHARS.sub('_', segment) for segment in key.split('/')]
+
+    if split == 'region' or len(segments) < 3:
+        return segments[0]
+
+    return '/'.join(segments)
+
+
+def _generate_unique_path(path, paths):
+    unique_path = path
+    root, ext = os.path.splitext(path)
+
+    for number in itertools.count(2):
+        if unique_path not in paths:
+            return unique_path
+        unique_path = '{}.{}{}'.format(root, number, ext)
+
 
 class Inspired():
     def __init__(self):
@@ -96,25 +259,31 @@ class Inspired():
 
 class InspiredNode():
     def __init__(self):
+        self.key = None
         self.template = None
+        self.emitter = None
         self.content = {}
 
-    def render(self):
-        if self.template:
+    def render(self, backend='template'):
+        if backend == 'native' and self.emitter:
+            return self.render_native()
+        elif self.template:
             return self.render_template()
         else:
             return self.render_yaml()
 
     def render_template(self):
-        env = Environment(loader=PackageLoader('playwright', 'templates'))
-        env.filters['dump_yaml'] = _dump_yaml
-
-        template = env.get_template(self.template)
+        template = get_template_environment().get_template(self.template)
         renderd = template.render(content=self.content)
         return renderd
 
+    def render_native(self):
+        buffer = io.StringIO()
+        self.emitter(self.content, buffer.write)
+        return buffer.getvalue()
+
     def render_yaml(self):
-        return yaml.dump([self.content], default_flow_style=False, allow_unicode=True)
+        return yaml_backend.dump([self.content], default_flow_style=False, allow_unicode=True)
 
 
 class InspiredRole(InspiredNode):
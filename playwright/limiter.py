@@ -0,0 +1,58 @@
+import random
+import threading
+import time
+
+
+class AdaptiveRateLimiter():
+    # token bucket whose rate increases on success and decreases on throttling.
+    # the bucket starts full, so requests are not delayed until they exceed the rate
+
+    def __init__(self, rate=10.0, min_rate=0.1, max_rate=10.0, burst=None):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        # requests of one second at max_rate by default
+        self.burst = burst if burst is not None else max(1, max_rate)
+
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # reserve a token, waiting until the bucket refills if it is not available yet
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+    def succeed(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
+    def throttle(self, attempt, backoff_base=0.5, backoff_max=30):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+        # full jitter backoff
+        time.sleep(random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt))))
+
+
+class AdaptiveRateLimiters():
+    # rate limiters shared by playhouses of the same user, region and rate settings
+
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, create_limiter):
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = create_limiter()
+
+            return self._limiters[key]
@@ -1 +0,0 @@
-from . import nifcloud # noqa
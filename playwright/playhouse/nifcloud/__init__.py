@@ -1,2 +1,5 @@
-from .model import NifcloudUser  # noqa F401
+from .catalog import NifcloudRegionCatalog  # noqa F401
+from .model import NifcloudDescribeRequest, NifcloudUser  # noqa F401
 from .playhouse import NifcloudPlayhouse  # noqa F401
+from .pool import NifcloudConnectionPools  # noqa F401
+from .snapshot import NifcloudSnapshot  # noqa F401
@@ -0,0 +1,39 @@
+import threading
+
+
+class NifcloudRegionCatalog():
+    # resolves region names of each user once per run, shared by playhouses of all inspirations
+
+    DEFAULT_TTL = 86400
+
+    @classmethod
+    def create_cache(cls, config, response_cache=None):
+        if not response_cache:
+            return None
+
+        # region list rarely changes, so it is cached longer than describe responses
+        return response_cache.with_ttl(int(config.get_option('region_cache_ttl', cls.DEFAULT_TTL)))
+
+    def __init__(self):
+        self._region_names = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get_region_names(self, access_key, default_region, load, cache=None):
+        key = (access_key, default_region)
+
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        # inspirations of the same user wait for the first one instead of describing regions again
+        with lock:
+            if key not in self._region_names:
+                self._region_names[key] = self._load(access_key, default_region, load, cache)
+
+            return self._region_names[key]
+
+    def _load(self, access_key, default_region, load, cache):
+        if not cache:
+            return load()
+
+        return cache.fetch(['RegionCatalog', access_key, default_region], load)
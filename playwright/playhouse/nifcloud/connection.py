@@ -0,0 +1,92 @@
+import copy
+from urllib.parse import urlencode
+
+from lxml import etree
+
+from playwright.profiler import get_profiler
+
+import requests
+
+from sleety.auth import SignatureV2
+from sleety.computing.connection import ComputingConnection, ComputingResponse
+from sleety.computing.error import SleetyComputingResponseError
+from sleety.error import SleetyUnsupportedError
+
+
+class NifcloudComputingConnection(ComputingConnection):
+
+    def __init__(self, *args, profile_args=None, **kwargs):
+        super(NifcloudComputingConnection, self).__init__(*args, **kwargs)
+        self.profile_args = profile_args if profile_args else {}
+
+        # sleety sends each request without a session, a session keeps the connection and TLS session alive between requests
+        self.session = requests.Session()
+
+    def send_request(self, action, params=None, method='POST', signature_version='v2'):
+        if signature_version != 'v2':
+            raise SleetyUnsupportedError('Unsupported signature version')
+
+        self.wait_interval()
+        response = self._send_request_v2(action, params, method)
+
+        profiler = get_profiler()
+        if profiler.enabled:
+            profiler.count('api_calls', action=action, **self.profile_args)
+            profiler.count('api_bytes_received', len(response.content), action=action, **self.profile_args)
+
+        # error pages of proxies or load balancers are not parsable as responses of the api
+        if response.status_code != 200 and not _is_error_response(response):
+            raise NifcloudComputingHttpError(response)
+
+        return response
+
+    def _send_request_v2(self, action, params, method):
+        # same request as SignatureV2.request of sleety
+        request_params = copy.deepcopy(params) if params else {}
+        request_params['Action'] = action
+        request_params['AccessKeyId'] = self.access_key
+        request_params['SignatureMethod'] = 'HmacSHA256'
+        request_params['SignatureVersion'] = '2'
+        request_params['Signature'] = SignatureV2.calculate_signature(self.secret_access_key, method, self.endpoint, self.path, request_params)
+
+        url = 'https://{0}{1}'.format(self.endpoint, self.path)
+
+        if method == 'GET':
+            return self.session.get('{0}?{1}'.format(url, urlencode(request_params)), timeout=self.timeout)
+        elif method == 'POST':
+            return self.session.post(url, urlencode(request_params), timeout=self.timeout)
+
+        raise SleetyUnsupportedError('Unsupported method: {}'.format(method))
+
+    def _create_response(self, response):
+        return NifcloudComputingResponse(response)
+
+
+class NifcloudComputingResponse(ComputingResponse):
+
+    def has_error(self):
+        # ComputingResponse prints the status code to stdout, where the playbook is output
+        if self.response.status_code != 200:
+            return True
+
+        return super(NifcloudComputingResponse, self).has_error()
+
+
+class NifcloudComputingHttpError(SleetyComputingResponseError):
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.error_code = None
+        self.error_message = None
+        self.message = 'response status: {0}'.format(self.status_code)
+
+        Exception.__init__(self, self.message)
+
+
+def _is_error_response(response):
+    try:
+        xml_root = etree.fromstring(response.text.encode('utf-8'))
+    except etree.XMLSyntaxError:
+        return False
+
+    return etree.QName(xml_root).localname == 'Response'
@@ -1,3 +1,10 @@
+import collections
+
+
+# describe call which a module declares before generating tasks
+NifcloudDescribeRequest = collections.namedtuple('NifcloudDescribeRequest', ['region', 'action', 'describe_func', 'params'])
+
+
 class NifcloudUser():
     def __init__(self, user_id=None, access_key=None, secret_access_key=None, regions=None):
         self.user_id = user_id
@@ -12,3 +19,130 @@ class NifcloudUser():
             return '{{ ' + var_content + ' }}'
         else:
             return getattr(self, key)
+
+
+class NifcloudFwGroup():
+    # fw group converted from a DescribeSecurityGroups item, ip_permissions is None if the group has no ipPermissions
+
+    __slots__ = ('group_name', 'availability_zone', 'log_limit', 'ip_permissions')
+
+    @classmethod
+    def from_response(cls, fw_group):
+        ip_permissions = None
+
+        if _item_as_list(fw_group, 'ipPermissions'):
+            ip_permissions = []
+            for ip_permission in fw_group['ipPermissions']:
+                ip_permissions.extend(NifcloudFwPermission.from_response(ip_permission))
+
+            ip_permissions.sort(key=NifcloudFwPermission.get_sort_key)
+
+        return cls(fw_group['groupName'], fw_group['availabilityZone'], fw_group['groupLogLimit'], ip_permissions)
+
+    def __init__(self, group_name, availability_zone, log_limit, ip_permissions=None):
+        self.group_name = group_name
+        self.availability_zone = availability_zone
+        self.log_limit = log_limit
+        self.ip_permissions = ip_permissions
+
+
+class NifcloudFwPermission():
+    # a row of ip_permissions, which has either cidr_ip or group_name. empty ports and description are None
+
+    __slots__ = ('ip_protocol', 'in_out', 'cidr_ip', 'group_name', 'from_port', 'to_port', 'description', 'sort_key')
+
+    @classmethod
+    def from_response(cls, ip_permission):
+        # yields a row for each ip range and group of an ipPermissions item
+        ip_ranges = _item_as_list(ip_permission, 'ipRanges')
+        groups = _item_as_list(ip_permission, 'groups')
+
+        if not ip_ranges and not groups:
+            return
+
+        ip_protocol = ip_permission['ipProtocol']
+        in_out = ip_permission['inOut']
+        from_port = ip_permission.get('fromPort') or None
+        to_port = ip_permission.get('toPort') or None
+        description = ip_permission.get('description') or None
+
+        # rows of the item share the head of sort key
+        sort_key_head = cls._generate_sort_key_head(ip_protocol, in_out, from_port, to_port, description)
+
+        for ip_range in ip_ranges:
+            cidr_ip = ip_range['cidrIp']
+            yield cls(ip_protocol, in_out, from_port, to_port, description, cidr_ip, None, sort_key_head + ('', cidr_ip))
+
+        for group in groups:
+            group_name = group['groupName']
+            yield cls(ip_protocol, in_out, from_port, to_port, description, None, group_name, sort_key_head + (group_name, ''))
+
+    @staticmethod
+    def get_sort_key(ip_permission):
+        return ip_permission.sort_key
+
+    @staticmethod
+    def _generate_sort_key_head(ip_protocol, in_out, from_port, to_port, description):
+        return (
+            ip_protocol,
+            in_out,
+            _generate_port_sort_key(from_port),
+            _generate_port_sort_key(to_port),
+            description if description is not None else '',
+        )
+
+    def __init__(self, ip_protocol, in_out, from_port=None, to_port=None, description=None, cidr_ip=None, group_name=None, sort_key=None):
+        self.ip_protocol = ip_protocol
+        self.in_out = in_out
+        self.cidr_ip = cidr_ip
+        self.group_name = group_name
+        self.from_port = from_port
+        self.to_port = to_port
+        self.description = description
+
+        if sort_key is None:
+            sort_key = self._generate_sort_key_head(ip_protocol, in_out, from_port, to_port, description) + (
+                group_name if group_name is not None else '',
+                cidr_ip if cidr_ip is not None else '',
+            )
+        self.sort_key = sort_key
+
+    def to_dict(self):
+        ip_permission = collections.OrderedDict((
+            ('ip_protocol', self.ip_protocol),
+            ('in_out', self.in_out),
+        ))
+
+        if self.cidr_ip is not None:
+            ip_permission['cidr_ip'] = self.cidr_ip
+        else:
+            ip_permission['group_name'] = self.group_name
+
+        if self.from_port is not None:
+            ip_permission['from_port'] = self.from_port
+
+        if self.to_port is not None:
+            ip_permission['to_port'] = self.to_port
+
+        if self.description is not None:
+            ip_permission['description'] = self.description
+
+        return ip_permission
+
+
+def _item_as_list(dic, key):
+    if key not in dic or not dic[key]:
+        return []
+
+    return dic[key]
+
+
+def _generate_port_sort_key(port):
+    # ports are int from the api but may be str, missing ports come first and int ports are in numeric order
+    if port is None:
+        return (0, 0, '')
+
+    if isinstance(port, int):
+        return (1, port, '')
+
+    return (2, 0, str(port))
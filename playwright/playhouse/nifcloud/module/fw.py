@@ -1,9 +1,15 @@
-import re
-
-from future.moves.collections import OrderedDict
+import collections
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 
 from playwright.error import PlaywrightUnsupportedError
+from playwright.filter import ResourceFilter
 from playwright.inspired import InspiredTask
+from playwright.playhouse.nifcloud.model import NifcloudDescribeRequest, NifcloudFwGroup
+from playwright.playhouse.nifcloud.module.fw_emitter import emit_fw_group_task, emit_fw_ip_permissions_task
+from playwright.profiler import get_profiler
 
 from sleety import computing
 from sleety.computing.connection import ComputingConnection
@@ -12,87 +18,167 @@ from sleety.region import NifcloudRegion
 
 class NifcloudModuleFw():
 
+    TASK_MODES = ('group', 'loop')
+
+    # items of looped tasks run when one of their tags is selected, as tasks of group mode do
+    LOOP_ITEM_CONDITION = "('all' in ansible_run_tags or item.tags | intersect(ansible_run_tags)) and not item.tags | intersect(ansible_skip_tags)"
+
     def __init__(self, playhouse, module_config):
         self._playhouse = playhouse
-        self._resources = None
         self._module_config = module_config
+        self._filter = ResourceFilter.from_config(module_config)
+        self._task_mode = module_config['task_mode'] if 'task_mode' in module_config else 'group'
+
+        if self._task_mode not in self.TASK_MODES:
+            raise PlaywrightUnsupportedError('unsupported task_mode: {}'.format(self._task_mode))
 
     def inspire_tasks(self):
-        tasks = []
+        return list(self.generate_tasks())
 
-        self._resources = self._extract_resources()
-        region_names = sorted(self._resources.keys())
+    def generate_describe_requests(self):
+        for region in self._sort_regions():
+            yield self._generate_describe_request(region)
 
-        for region_name in region_names:
-            fw_groups = self._resources[region_name]
-
-            if not fw_groups:
-                continue
+    def generate_tasks(self):
+        profiler = get_profiler()
 
+        for region_name, sorted_fw_groups in self._generate_target_resources():
             region = NifcloudRegion(region_name)
             endpoint = ComputingConnection.generate_endpoint(region)
+            profile_args = self._generate_profile_args(region_name)
 
-            target_fw_groups = [fw_group for fw_group in fw_groups if self._is_target(fw_group)]
-
-            sorted_fw_groups = self._sort_fw_groups(target_fw_groups)
+            if self._task_mode == 'loop':
+                yield from self._generate_loop_tasks(region_name, endpoint, sorted_fw_groups, profile_args)
+                continue
 
             for fw_group in sorted_fw_groups:
-                task = self._generate_group_task(endpoint, fw_group)
+                with profiler.span('generate_group_task', trace=False, **profile_args):
+                    task = self._generate_group_task(endpoint, fw_group)
                 if task:
-                    tasks.append(task)
+                    task.key = '{}/{}/fw_group'.format(region_name, fw_group.group_name)
+                    profiler.count('tasks', **profile_args)
+                    yield task
 
             for fw_group in sorted_fw_groups:
-                task = self._generate_ip_permissions_task(endpoint, fw_group)
+                with profiler.span('generate_ip_permissions_task', trace=False, **profile_args):
+                    task = self._generate_ip_permissions_task(endpoint, fw_group)
                 if task:
-                    tasks.append(task)
+                    task.key = '{}/{}/fw_ip_permissions'.format(region_name, fw_group.group_name)
+                    profiler.count('tasks', **profile_args)
+                    profiler.count('rules', len(task.content['local_action']['ip_permissions']), **profile_args)
+                    yield task
+
+    def _generate_loop_tasks(self, region_name, endpoint, sorted_fw_groups, profile_args):
+        profiler = get_profiler()
+
+        with profiler.span('generate_group_task', trace=False, **profile_args):
+            task = self._generate_group_loop_task(region_name, endpoint, sorted_fw_groups)
+        if task:
+            task.key = '{}/fw_groups'.format(region_name)
+            profiler.count('tasks', **profile_args)
+            yield task
+
+        with profiler.span('generate_ip_permissions_task', trace=False, **profile_args):
+            task = self._generate_ip_permissions_loop_task(region_name, endpoint, sorted_fw_groups)
+        if task:
+            task.key = '{}/fw_ip_permissions'.format(region_name)
+            profiler.count('tasks', **profile_args)
+            profiler.count('rules', sum(len(item['ip_permissions']) for item in task.content['vars']['nifcloud_fw_ip_permissions']), **profile_args)
+            yield task
+
+    def _generate_target_resources(self):
+        # filters, converts and sorts each region in one pass
+        for region_name, fw_groups in self._generate_resources():
+            if not fw_groups:
+                continue
 
-        return tasks
+            with get_profiler().span('filter', **self._generate_profile_args(region_name)):
+                sorted_fw_groups = self._sort_fw_groups(NifcloudFwGroup.from_response(fw_group) for fw_group in self._filter.filter(fw_groups))
 
-    def _extract_resources(self):
-        resources = {}
+            # release responses while tasks of the region are generated, tasks are generated from converted groups
+            del fw_groups
 
-        for region in self._playhouse.user.regions:
-            region_resource = self._extract_resources_with_region(region)
-            resources[region.name] = region_resource
+            yield region_name, sorted_fw_groups
 
-        return resources
+    def _generate_profile_args(self, region_name):
+        return {'inspiration': self._playhouse.name, 'module': self._module_config['module'], 'region': region_name}
 
-    def _extract_resources_with_region(self, region):
+    def _generate_resources(self):
+        # yields (region name, resources) sorted by region name as soon as each region is described
+        sorted_regions = self._sort_regions()
+
+        max_workers = min(int(self._playhouse.config.get_option('describe_workers', 1)), len(sorted_regions))
+
+        if max_workers <= 1 or self._playhouse.is_describing_ahead():
+            for region in sorted_regions:
+                yield region.name, self._extract_resources_with_region(region)
+            return
+
+        # describes at most max_workers regions ahead, so that responses of all regions are not held at once
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending_regions = iter(sorted_regions)
+            describe_jobs = collections.deque()
+
+            for region in itertools.islice(pending_regions, max_workers):
+                describe_jobs.append((region.name, executor.submit(self._extract_resources_with_region, region)))
+
+            while describe_jobs:
+                describe_jobs[0][1].result()
+
+                for region in itertools.islice(pending_regions, 1):
+                    describe_jobs.append((region.name, executor.submit(self._extract_resources_with_region, region)))
+
+                # neither this frame nor the finished job refers to the resources while they are consumed
+                yield _pop_described(describe_jobs)
+
+    def _sort_regions(self):
+        regions = {region.name: region for region in self._playhouse.user.regions}
+        return [regions[region_name] for region_name in sorted(regions)]
+
+    def _generate_describe_request(self, region):
         config = self._module_config
         params = config['describe_params'] if 'describe_params' in config else {}
 
-        conn = self._playhouse.create_connection(region)
-        desc_fw = computing.fw.describe_fw_groups(conn, params)
+        return NifcloudDescribeRequest(region, 'DescribeSecurityGroups', computing.fw.describe_fw_groups, params)
+
+    def _extract_resources_with_region(self, region):
+        playhouse = self._playhouse
+
+        if playhouse.from_snapshot:
+            return playhouse.snapshot.load_fw_groups(playhouse.get_snapshot_user(), region.name)
+
+        desc_fw = playhouse.describe(*self._generate_describe_request(region))
+
+        # describe_params may narrow fw groups, which would replace all groups of the region in snapshot
+        if playhouse.snapshot and 'describe_params' not in self._module_config:
+            with get_profiler().span('save_snapshot', **self._generate_profile_args(region.name)):
+                playhouse.snapshot.save_fw_groups(playhouse.get_snapshot_user(), region.name, desc_fw)
 
         return desc_fw
 
     def _sort_fw_groups(self, fw_groups):
-        return sorted(fw_groups, key=lambda x: x.get('groupName', ''))
+        return sorted(fw_groups, key=attrgetter('group_name'))
 
     def _generate_group_task(self, endpoint, fw_group):
         user = self._playhouse.user
         access_key = user.get_playbook_vars('access_key')
         secret_access_key = user.get_playbook_vars('secret_access_key')
 
-        tags = [
-            fw_group['groupName'],
-            'nifcloud_fw',
-            'nifcloud_fw_group',
-            'nifcloud_fw_group_{}'.format(fw_group['groupName']),
-        ]
+        tags = self._generate_group_tags(fw_group, 'nifcloud_fw_group')
 
         task = InspiredTask()
         task.template = 'nifcloud/default.task.fw_group.yml.j2'
+        task.emitter = emit_fw_group_task
         task.content = OrderedDict((
-            ('name', 'create fw {}'.format(fw_group['groupName'])),
+            ('name', 'create fw {}'.format(fw_group.group_name)),
             ('local_action', OrderedDict((
                 ('module', 'nifcloud_fw'),
                 ('access_key', access_key),
                 ('secret_access_key', secret_access_key),
                 ('endpoint', endpoint),
-                ('group_name', fw_group['groupName']),
-                ('availability_zone', fw_group['availabilityZone']),
-                ('log_limit', fw_group['groupLogLimit']),
+                ('group_name', fw_group.group_name),
+                ('availability_zone', fw_group.availability_zone),
+                ('log_limit', fw_group.log_limit),
                 ('state', 'present'),
                 ('purge_ip_permissions', False),
             ))),
@@ -102,148 +188,131 @@ class NifcloudModuleFw():
         return task
 
     def _generate_ip_permissions_task(self, endpoint, fw_group):
-        task_ip_permissions = []
-        ip_permissions = self.dict_item_as_list(fw_group, 'ipPermissions')
-
-        if not ip_permissions:
+        if fw_group.ip_permissions is None:
             return None
 
-        for ip_permission in ip_permissions:
-
-            ip_ranges = self.dict_item_as_list(ip_permission, 'ipRanges')
-
-            for ip_range in ip_ranges:
-                task_ip_permission = OrderedDict((
-                    ('ip_protocol', ip_permission['ipProtocol']),
-                    ('in_out', ip_permission['inOut']),
-                    ('cidr_ip', ip_range['cidrIp']),
-                ))
-
-                if 'fromPort' in ip_permission and ip_permission['fromPort']:
-                    task_ip_permission['from_port'] = ip_permission['fromPort']
-
-                if 'toPort' in ip_permission and ip_permission['toPort']:
-                    task_ip_permission['to_port'] = ip_permission['toPort']
-
-                if 'description' in ip_permission and ip_permission['description']:
-                    task_ip_permission['description'] = ip_permission['description']
-
-                task_ip_permissions.append(task_ip_permission)
-
-            groups = self.dict_item_as_list(ip_permission, 'groups')
-
-            for group in groups:
-                task_ip_permission = OrderedDict((
-                    ('ip_protocol', ip_permission['ipProtocol']),
-                    ('in_out', ip_permission['inOut']),
-                    ('group_name', group['groupName']),
-                ))
-
-                if 'fromPort' in ip_permission and ip_permission['fromPort']:
-                    task_ip_permission['from_port'] = ip_permission['fromPort']
-
-                if 'toPort' in ip_permission and ip_permission['toPort']:
-                    task_ip_permission['to_port'] = ip_permission['toPort']
-
-                if 'description' in ip_permission and ip_permission['description']:
-                    task_ip_permission['description'] = ip_permission['description']
-
-                task_ip_permissions.append(task_ip_permission)
-
-        sorted_task_ip_permission = sorted(
-            task_ip_permissions,
-            key=lambda x: (
-                x.get('ip_protocol', ''),
-                x.get('in_out', ''),
-                x.get('from_port', ''),
-                x.get('to_port', ''),
-                x.get('description', ''),
-                x.get('group_name', ''),
-                x.get('cidr_ip', ''),
-            )
-        )
+        task_ip_permissions = [ip_permission.to_dict() for ip_permission in fw_group.ip_permissions]
 
         user = self._playhouse.user
         access_key = user.get_playbook_vars('access_key')
         secret_access_key = user.get_playbook_vars('secret_access_key')
 
-        tags = [
-            fw_group['groupName'],
-            'nifcloud_fw',
-            'nifcloud_fw_ip_permissions',
-            'nifcloud_fw_ip_permissions_{}'.format(fw_group['groupName']),
-        ]
+        tags = self._generate_group_tags(fw_group, 'nifcloud_fw_ip_permissions')
 
         task = InspiredTask()
         task.template = 'nifcloud/default.task.fw_ip_permissions.yml.j2'
+        task.emitter = emit_fw_ip_permissions_task
         task.content = OrderedDict((
-            ('name', 'configure {} ip_permissions'.format(fw_group['groupName'])),
+            ('name', 'configure {} ip_permissions'.format(fw_group.group_name)),
             ('local_action', OrderedDict((
                 ('module', 'nifcloud_fw'),
                 ('access_key', access_key),
                 ('secret_access_key', secret_access_key),
                 ('endpoint', endpoint),
-                ('group_name', fw_group['groupName']),
+                ('group_name', fw_group.group_name),
                 ('purge_ip_permissions', True),
-                ('ip_permissions', sorted_task_ip_permission),
+                ('ip_permissions', task_ip_permissions),
             ))),
             ('tags', tags),
         ))
 
         return task
 
-    def _is_target(self, target):
-        is_include = self._is_include(target)
-        is_exclude = self._is_exclude(target)
-
-        return is_include and not is_exclude
-
-    def _is_include(self, target):
-        if 'includes' not in self._module_config:
-            return True
-
-        includes = self._module_config['includes']
-
-        for include in includes:
-            if include['key'] not in target:
-                continue
+    def _generate_group_loop_task(self, region_name, endpoint, sorted_fw_groups):
+        if not sorted_fw_groups:
+            return None
 
-            value = target[include['key']]
+        user = self._playhouse.user
+        access_key = user.get_playbook_vars('access_key')
+        secret_access_key = user.get_playbook_vars('secret_access_key')
 
-            if not isinstance(value, str):
-                raise PlaywrightUnsupportedError('include supports only str')
+        items = [
+            OrderedDict((
+                ('group_name', fw_group.group_name),
+                ('availability_zone', fw_group.availability_zone),
+                ('log_limit', fw_group.log_limit),
+                ('tags', self._generate_group_tags(fw_group, 'nifcloud_fw_group')),
+            ))
+            for fw_group in sorted_fw_groups
+        ]
 
-            regexp = re.compile(include['regexp'])
-            if re.search(regexp, value):
-                return True
+        task = InspiredTask()
+        task.template = 'nifcloud/default.task.fw_group_loop.yml.j2'
+        task.content = OrderedDict((
+            ('name', 'create fw groups in {}'.format(region_name)),
+            ('local_action', OrderedDict((
+                ('module', 'nifcloud_fw'),
+                ('access_key', access_key),
+                ('secret_access_key', secret_access_key),
+                ('endpoint', endpoint),
+                ('group_name', '{{ item.group_name }}'),
+                ('availability_zone', '{{ item.availability_zone }}'),
+                ('log_limit', '{{ item.log_limit }}'),
+                ('state', 'present'),
+                ('purge_ip_permissions', False),
+            ))),
+            ('loop', '{{ nifcloud_fw_groups }}'),
+            ('loop_control', OrderedDict((('label', '{{ item.group_name }}'),))),
+            ('when', self.LOOP_ITEM_CONDITION),
+            ('vars', OrderedDict((('nifcloud_fw_groups', items),))),
+            ('tags', self._generate_loop_tags('nifcloud_fw_group')),
+        ))
 
-        return False
+        return task
 
-    def _is_exclude(self, target):
-        if 'excludes' not in self._module_config:
-            return False
+    def _generate_ip_permissions_loop_task(self, region_name, endpoint, sorted_fw_groups):
+        items = [
+            OrderedDict((
+                ('group_name', fw_group.group_name),
+                ('ip_permissions', [ip_permission.to_dict() for ip_permission in fw_group.ip_permissions]),
+                ('tags', self._generate_group_tags(fw_group, 'nifcloud_fw_ip_permissions')),
+            ))
+            for fw_group in sorted_fw_groups if fw_group.ip_permissions is not None
+        ]
 
-        excludes = self._module_config['excludes']
+        if not items:
+            return None
 
-        for exclude in excludes:
-            if exclude['key'] not in target:
-                continue
+        user = self._playhouse.user
+        access_key = user.get_playbook_vars('access_key')
+        secret_access_key = user.get_playbook_vars('secret_access_key')
 
-            value = target[exclude['key']]
+        task = InspiredTask()
+        task.template = 'nifcloud/default.task.fw_ip_permissions_loop.yml.j2'
+        task.content = OrderedDict((
+            ('name', 'configure ip_permissions in {}'.format(region_name)),
+            ('local_action', OrderedDict((
+                ('module', 'nifcloud_fw'),
+                ('access_key', access_key),
+                ('secret_access_key', secret_access_key),
+                ('endpoint', endpoint),
+                ('group_name', '{{ item.group_name }}'),
+                ('purge_ip_permissions', True),
+                ('ip_permissions', '{{ item.ip_permissions }}'),
+            ))),
+            ('loop', '{{ nifcloud_fw_ip_permissions }}'),
+            ('loop_control', OrderedDict((('label', '{{ item.group_name }}'),))),
+            ('when', self.LOOP_ITEM_CONDITION),
+            ('vars', OrderedDict((('nifcloud_fw_ip_permissions', items),))),
+            ('tags', self._generate_loop_tags('nifcloud_fw_ip_permissions')),
+        ))
 
-            if not isinstance(value, str):
-                raise PlaywrightUnsupportedError('exclude supports only str')
+        return task
 
-            regexp = re.compile(exclude['regexp'])
-            if re.search(regexp, value):
-                return True
+    def _generate_group_tags(self, fw_group, task_tag):
+        return [
+            fw_group.group_name,
+            'nifcloud_fw',
+            task_tag,
+            '{}_{}'.format(task_tag, fw_group.group_name),
+        ]
 
-        return False
+    def _generate_loop_tags(self, task_tag):
+        # tags of each group are not set to the task, since skipping one of them would skip all items.
+        # the task always runs and its items are selected by LOOP_ITEM_CONDITION
+        return ['nifcloud_fw', task_tag, 'always']
 
-    def dict_item_as_list(self, dic, key):
-        if key not in dic:
-            return []
-        elif not dic[key]:
-            return []
 
-        return dic[key]
+def _pop_described(describe_jobs):
+    region_name, describe_job = describe_jobs.popleft()
+    return region_name, describe_job.result()
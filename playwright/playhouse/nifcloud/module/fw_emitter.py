@@ -0,0 +1,55 @@
+from playwright import yaml_backend
+
+
+# emitters write the same text as templates/nifcloud/default.task.fw_*.yml.j2 without jinja2
+
+
+def emit_fw_group_task(content, write):
+    local_action = content['local_action']
+
+    write('- name: {}\n'.format(content['name']))
+    write('  local_action:\n')
+    write('    module: {}\n'.format(local_action['module']))
+    write('    access_key: "{}"\n'.format(local_action['access_key']))
+    write('    secret_access_key: "{}"\n'.format(local_action['secret_access_key']))
+    write('    endpoint: {}\n'.format(local_action['endpoint']))
+    write('    group_name: {}\n'.format(local_action['group_name']))
+    write('    availability_zone: {}\n'.format(local_action['availability_zone']))
+    write('    log_limit: {}\n'.format(local_action['log_limit']))
+    write('    state: {}\n'.format(local_action['state']))
+    write('    purge_ip_permissions: {}\n'.format(local_action['purge_ip_permissions']))
+    write('  tags: {}'.format(yaml_backend.dump_flow(content['tags'])))
+    write('\n')
+
+
+def emit_fw_ip_permissions_task(content, write):
+    local_action = content['local_action']
+
+    write('- name: {}\n'.format(content['name']))
+    write('  local_action:\n')
+    write('    module: {}\n'.format(local_action['module']))
+    write('    access_key: "{}"\n'.format(local_action['access_key']))
+    write('    secret_access_key: "{}"\n'.format(local_action['secret_access_key']))
+    write('    endpoint: {}\n'.format(local_action['endpoint']))
+    write('    group_name: {}\n'.format(local_action['group_name']))
+    write('    purge_ip_permissions: {}\n'.format(local_action['purge_ip_permissions']))
+    write('    ip_permissions:\n')
+
+    ip_permissions = ''.join('- {}'.format(yaml_backend.dump_flow(ip_permission)) for ip_permission in local_action['ip_permissions'])
+    write(_indent(ip_permissions, 6))
+
+    write('\n')
+    write('  tags: {}'.format(yaml_backend.dump_flow(content['tags'])))
+    write('\n')
+
+
+def _indent(text, width):
+    # same as jinja2 filter indent(width, True)
+    indention = ' ' * width
+    lines = (text + '\n').splitlines()
+
+    indented = lines.pop(0)
+    if lines:
+        indented += '\n' + '\n'.join(indention + line if line else line for line in lines)
+
+    return indention + indented
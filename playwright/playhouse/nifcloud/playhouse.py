@@ -1,41 +1,181 @@
-from future.moves.collections import OrderedDict
+import json
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-from playwright.error import PlaywrightError, PlaywrightUnsupportedError
+from playwright.coalescer import RequestCoalescer
+from playwright.error import PlaywrightError
 from playwright.inspired import Inspired, InspiredRole
+from playwright.limiter import AdaptiveRateLimiter, AdaptiveRateLimiters
+from playwright.playhouse.nifcloud.catalog import NifcloudRegionCatalog
+from playwright.playhouse.nifcloud.connection import NifcloudComputingConnection
 from playwright.playhouse.nifcloud.model import NifcloudUser
-from playwright.playhouse.nifcloud.module import NifcloudModuleFw
+from playwright.playhouse.nifcloud.pool import NifcloudConnectionPool, NifcloudConnectionPools
+from playwright.playhouse.nifcloud.prefetch import NifcloudPrefetcher
+from playwright.playhouse.nifcloud.snapshot import NifcloudSnapshot
+from playwright.profiler import get_profiler
+from playwright.registry import load_module
+
+import requests
 
 from sleety import computing
-from sleety.computing.connection import ComputingConnection
+from sleety.computing.error import SleetyComputingResponseError
 from sleety.region import NifcloudRegion
 
 
 class NifcloudPlayhouse():
 
-    def __init__(self):
+    DEFAULT_TIMEOUT = 60
+    DEFAULT_REQUEST_INTERVAL = 0
+    DEFAULT_CONNECTION_POOL_SIZE = 4
+    DEFAULT_MIN_REQUEST_RATE = 0.1
+    DEFAULT_MAX_REQUEST_RATE = 10
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_REGION = 'jp-east-1'
+
+    THROTTLING_ERROR_CODES = ('Throttling', 'Server.Throttling', 'RequestLimitExceeded')
+
+    # settings of connections, a connection pool is shared only by playhouses having the same ones
+    CONNECTION_SETTINGS = ('timeout', 'request_interval', 'connection_pool_size')
+
+    # settings of rate limiters, a rate limiter of a region is shared only by playhouses having the same ones
+    RATE_SETTINGS = ('request_rate', 'min_request_rate', 'max_request_rate')
+
+    def __init__(self, response_cache=None, name=None, region_catalog=None, connection_pools=None, request_coalescer=None, rate_limiters=None,
+                 from_snapshot=False):
+        self.name = name
         self.user = None
         self.config = None
         self.inspiration = None
+        self.response_cache = response_cache
+        self.region_catalog = region_catalog if region_catalog else NifcloudRegionCatalog()
+        self.connection_pools = connection_pools if connection_pools else NifcloudConnectionPools()
+        self.request_coalescer = request_coalescer if request_coalescer else RequestCoalescer()
+        self.rate_limiters = rate_limiters if rate_limiters else AdaptiveRateLimiters()
+        self.connection_pool = None
+        self.snapshot = None
+        self.from_snapshot = from_snapshot
 
         self.inspired = None
 
+        self._modules = None
+        self._describe_requests = None
+        self._declared_keys = Counter()
+        self._declared_keys_lock = threading.Lock()
+        self._prefetcher = None
+        self._region_settings = {}
+        self._connection_pool_lock = threading.Lock()
+
+    @classmethod
+    def create_shared_options(cls):
+        # shared by playhouses of all inspirations in a run
+        return {
+            'region_catalog': NifcloudRegionCatalog(),
+            'connection_pools': NifcloudConnectionPools(),
+            'request_coalescer': RequestCoalescer(),
+            'rate_limiters': AdaptiveRateLimiters(),
+        }
+
     def init(self, config, inspiration):
         self.config = config
         self.inspiration = inspiration
 
+        self._init_snapshot()
         self._init_user()
+        self._init_modules()
 
-    def inspire(self):
+    def inspire(self, lazy=False):
         self.inspired = Inspired()
 
         self.inspired.roles.append(self._genelate_role_nifcloud())
 
-        for target_module in self.inspiration['modules']:
-            module_tasks = self._generate_module_tasks(target_module)
-            self.inspired.tasks.extend(module_tasks)
+        if lazy:
+            # tasks are described and generated while they are consumed
+            self.inspired.tasks = self._generate_tasks()
+        else:
+            self.inspired.tasks.extend(self._generate_tasks())
 
         return self.inspired
 
+    def _generate_tasks(self):
+        try:
+            yield from self._generate_module_tasks()
+        finally:
+            # requests not described by a failure are released, so that their responses are not kept for this playhouse
+            self._release_declared_requests()
+
+    def _generate_module_tasks(self):
+        if not self._describe_requests:
+            for module in self._modules:
+                yield from module.generate_tasks()
+            return
+
+        # describes requests declared by modules ahead through a window of describe_workers, modules take the results by describe()
+        max_workers = int(self.get_setting('describe_workers', 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            self._prefetcher = NifcloudPrefetcher(executor, self._describe_requests, max_workers, self._describe, self._generate_describe_key)
+
+            try:
+                for module in self._modules:
+                    yield from module.generate_tasks()
+            finally:
+                self._prefetcher.cancel()
+                self._prefetcher = None
+
+    def _init_modules(self):
+        self._modules = [self._create_module(target_module) for target_module in self.inspiration['modules']]
+        self._describe_requests = [] if self.from_snapshot else self._collect_describe_requests(self._modules)
+
+        # the coalescer keeps responses of declared requests until all playhouses declaring them have described them,
+        # so that modules and inspirations of the same user and region describe them once
+        for describe_request in self._describe_requests:
+            describe_key = self._generate_describe_key(describe_request.region, describe_request.action, describe_request.params)
+            self._declared_keys[describe_key] += 1
+            self.request_coalescer.expect(self._generate_coalescer_key(describe_key))
+
+    def _release_declared_request(self, describe_key):
+        with self._declared_keys_lock:
+            if self._declared_keys[describe_key] <= 0:
+                return
+
+            self._declared_keys[describe_key] -= 1
+
+        self.request_coalescer.release(self._generate_coalescer_key(describe_key))
+
+    def _release_declared_requests(self):
+        with self._declared_keys_lock:
+            describe_keys = list(self._declared_keys.elements())
+            self._declared_keys.clear()
+
+        for describe_key in describe_keys:
+            self.request_coalescer.release(self._generate_coalescer_key(describe_key))
+
+    def _collect_describe_requests(self, modules):
+        describe_requests = []
+
+        for module in modules:
+            # declaring describe requests is optional for modules
+            if hasattr(module, 'generate_describe_requests'):
+                describe_requests.extend(module.generate_describe_requests())
+
+        return describe_requests
+
+    def is_describing_ahead(self):
+        # modules describe one by one while declared requests are described ahead, so that describe_workers bounds them
+        return self._prefetcher is not None
+
+    def _init_snapshot(self):
+        snapshot_path = self.get_setting('snapshot_path', None)
+
+        if snapshot_path:
+            self.snapshot = NifcloudSnapshot.from_config(self.config, snapshot_path)
+        elif self.from_snapshot:
+            raise PlaywrightError('snapshot_path not found')
+
+    def get_snapshot_user(self):
+        # users are stored by user id, or by access key if the inspiration has it
+        return self.user.user_id if self.user.user_id else self.user.access_key
+
     def _init_user(self):
         self.user = NifcloudUser()
 
@@ -72,17 +212,24 @@ class NifcloudPlayhouse():
                 region_name = NifcloudRegion.correct_region_name(item['name'])
                 region = NifcloudRegion(region_name)
                 self.user.regions.append(region)
+                self._region_settings[region_name] = item
+        elif self.from_snapshot:
+            for region_name in self.snapshot.get_region_names(self.get_snapshot_user()):
+                self.user.regions.append(NifcloudRegion(region_name))
         else:
-            default_region = self.inspiration['regions'] if 'default_region' in self.inspiration else 'jp-east-1'
+            default_region = self.inspiration['default_region'] if 'default_region' in self.inspiration else self.DEFAULT_REGION
+            default_region = NifcloudRegion.correct_region_name(default_region)
 
-            region = NifcloudRegion(default_region)
-            conn = self.create_connection(region)
-            desc_regions = computing.region.describe_regions(conn)
+            region_names = self.region_catalog.get_region_names(
+                    self.user.access_key, default_region, lambda: self._describe_region_names(NifcloudRegion(default_region)),
+                    cache=NifcloudRegionCatalog.create_cache(self.config, self.response_cache))
 
-            for desc_region in desc_regions:
-                region_name = NifcloudRegion.correct_region_name(desc_region['regionName'])
-                region = NifcloudRegion(region_name)
-                self.user.regions.append(region)
+            for region_name in region_names:
+                self.user.regions.append(NifcloudRegion(region_name))
+
+    def _describe_region_names(self, region):
+        desc_regions = self.describe(region, 'DescribeRegions', computing.region.describe_regions)
+        return [NifcloudRegion.correct_region_name(desc_region['regionName']) for desc_region in desc_regions]
 
     def _genelate_role_nifcloud(self):
         role_nifcloud = self.inspiration['role_nifcloud'] if 'role_nifcloud' in self.inspiration else 'nifcloud'
@@ -95,20 +242,168 @@ class NifcloudPlayhouse():
         ))
         return role
 
-    def _generate_module_tasks(self, target_module):
-        module_id = target_module['module']
+    def _create_module(self, target_module):
+        module_class = load_module('nifcloud', target_module['module'])
+        return module_class(self, target_module)
+
+    def get_setting(self, key, default, region=None):
+        # region item of inspiration overrides inspiration, and inspiration overrides playwright_options
+        if region and key in self._region_settings.get(region.name, {}):
+            return self._region_settings[region.name][key]
+
+        if key in self.inspiration:
+            return self.inspiration[key]
+
+        return self.config.get_option(key, default)
+
+    def get_rate_limiter(self, region):
+        # shared by inspirations and configs of the same user, so that they are limited jointly when run in parallel
+        settings = [self.get_setting(key, None, region) for key in self.RATE_SETTINGS]
+        key = json.dumps([self.user.access_key, region.name, settings])
+
+        return self.rate_limiters.get(key, lambda: self._create_rate_limiter(region))
+
+    def _create_rate_limiter(self, region):
+        max_rate = float(self.get_setting('max_request_rate', self.DEFAULT_MAX_REQUEST_RATE, region))
 
-        # TODO mapping module
-        if module_id == 'nifcloud_fw':
-            module = NifcloudModuleFw(self, target_module)
-            return module.inspire_tasks()
+        # starts at max_request_rate, so that requests slow down only after throttling
+        rate = self.get_setting('request_rate', None, region)
+        rate = float(rate) if rate is not None else max_rate
 
-        raise PlaywrightUnsupportedError('unsupported module: {}'.format(module_id))
+        return AdaptiveRateLimiter(
+                rate=rate,
+                min_rate=float(self.get_setting('min_request_rate', self.DEFAULT_MIN_REQUEST_RATE, region)),
+                max_rate=max_rate)
 
-    def create_connection(self, region, timeout=60, request_interval=1, endpoint=None):
+    def get_connection_pool(self):
+        # created on first describe, after region settings are known
+        with self._connection_pool_lock:
+            if self.connection_pool is None:
+                pool_size = int(self.get_setting('connection_pool_size', self.DEFAULT_CONNECTION_POOL_SIZE))
+                self.connection_pool = self.connection_pools.get(
+                        self._generate_connection_pool_key(),
+                        lambda: NifcloudConnectionPool(self._generate_connection_factory(), size=pool_size))
+
+            return self.connection_pool
+
+    def _generate_connection_factory(self):
+        # the pool is shared by playhouses of a run, so the factory refers only to the user and connection settings, not to this playhouse
+        access_key = self.user.access_key
+        secret_access_key = self.user.secret_access_key
+        default_settings = self._generate_connection_settings(None)
+        region_settings = {region_name: self._generate_connection_settings(NifcloudRegion(region_name)) for region_name in self._region_settings}
+
+        def create_connection(region, endpoint=None):
+            timeout, request_interval = region_settings.get(region.name, default_settings)
+            return NifcloudComputingConnection(
+                    access_key, secret_access_key, region,
+                    timeout=timeout, request_interval=request_interval, endpoint=endpoint)
+
+        return create_connection
+
+    def _generate_connection_settings(self, region):
+        timeout = float(self.get_setting('timeout', self.DEFAULT_TIMEOUT, region))
+        request_interval = float(self.get_setting('request_interval', self.DEFAULT_REQUEST_INTERVAL, region))
+
+        return timeout, request_interval
+
+    def _generate_connection_pool_key(self):
+        settings = [self.get_setting(key, None) for key in self.CONNECTION_SETTINGS]
+        region_settings = sorted(
+                (region_name, [item.get(key) for key in self.CONNECTION_SETTINGS]) for region_name, item in self._region_settings.items())
+
+        return json.dumps([self.user.access_key, self.user.secret_access_key, settings, region_settings])
+
+    def describe(self, region, action, describe_func, params=None):
+        if self.from_snapshot:
+            raise PlaywrightError('{} is not available from snapshot'.format(action))
+
+        describe_key = self._generate_describe_key(region, action, params)
+        prefetcher = self._prefetcher
+        prefetch_job = prefetcher.take(describe_key) if prefetcher else None
+
+        try:
+            if prefetch_job:
+                return prefetch_job.result()
+
+            return self._describe(region, action, describe_func, params)
+        finally:
+            self._release_declared_request(describe_key)
+
+    def _generate_describe_key(self, region, action, params):
+        return json.dumps([region.name, action, params or {}], sort_keys=True)
+
+    def _generate_coalescer_key(self, describe_key):
+        # the coalescer is shared by playhouses of all users
+        return [self.user.access_key, describe_key]
+
+    def _describe(self, region, action, describe_func, params=None):
+        def load():
+            with self.get_connection_pool().connection(region) as conn:
+                # connections are shared by playhouses, calls are counted for the playhouse using it
+                conn.profile_args = {'inspiration': self.name, 'region': region.name}
+                return self._query(region, describe_func, conn, params)
+
+        def fetch():
+            if not self.response_cache:
+                return load()
+
+            return self.response_cache.fetch(key, load)
+
+        key = [self.user.access_key, region.name, action, params or {}]
+        profiler = get_profiler()
+
+        with profiler.span('describe', inspiration=self.name, action=action, region=region.name):
+            response, shared = self.request_coalescer.fetch(self._generate_coalescer_key(self._generate_describe_key(region, action, params)), fetch)
+
+        if shared:
+            profiler.count('coalesced_requests', inspiration=self.name, action=action, region=region.name)
+
+        return response
+
+    def _query(self, region, describe_func, conn, params):
+        rate_limiter = self.get_rate_limiter(region)
+        max_retries = int(self.get_setting('max_retries', self.DEFAULT_MAX_RETRIES, region))
+        attempt = 0
+
+        while True:
+            rate_limiter.acquire()
+
+            try:
+                response = describe_func(conn, params)
+            except (SleetyComputingResponseError, requests.ConnectionError, requests.Timeout) as error:
+                if attempt >= max_retries or not self._is_retryable(error):
+                    raise
+
+                attempt += 1
+                rate_limiter.throttle(attempt)
+                continue
+
+            rate_limiter.succeed()
+            return response
+
+    def _is_retryable(self, error):
+        if not isinstance(error, SleetyComputingResponseError):
+            # timeouts and connection errors
+            return True
+
+        if error.status_code == 429 or error.status_code >= 500:
+            return True
+
+        return error.error_code in self.THROTTLING_ERROR_CODES
+
+    def create_connection(self, region, timeout=None, request_interval=None, endpoint=None):
         access_key = self.user.access_key
         secret_access_key = self.user.secret_access_key
+        default_timeout, default_request_interval = self._generate_connection_settings(region)
+
+        if timeout is None:
+            timeout = default_timeout
+
+        if request_interval is None:
+            request_interval = default_request_interval
 
-        return ComputingConnection(
+        return NifcloudComputingConnection(
                 access_key, secret_access_key, region,
-                timeout=timeout, request_interval=request_interval, endpoint=endpoint)
+                timeout=timeout, request_interval=request_interval, endpoint=endpoint,
+                profile_args={'inspiration': self.name, 'region': region.name})
@@ -0,0 +1,58 @@
+import threading
+from contextlib import contextmanager
+
+
+class NifcloudConnectionPool():
+    # hands out connections keyed by region and endpoint, at most size connections per key
+
+    def __init__(self, create_connection, size=4):
+        self._create_connection = create_connection
+        self._size = size
+        self._condition = threading.Condition()
+        self._idle_connections = {}
+        self._connection_counts = {}
+
+    @contextmanager
+    def connection(self, region, endpoint=None):
+        key = (region.name, endpoint)
+        conn = self._acquire(key, region, endpoint)
+
+        try:
+            yield conn
+        finally:
+            self._release(key, conn)
+
+    def _acquire(self, key, region, endpoint):
+        with self._condition:
+            while True:
+                idle_connections = self._idle_connections.setdefault(key, [])
+                if idle_connections:
+                    return idle_connections.pop()
+
+                connection_count = self._connection_counts.get(key, 0)
+                if connection_count < self._size:
+                    conn = self._create_connection(region, endpoint=endpoint)
+                    self._connection_counts[key] = connection_count + 1
+                    return conn
+
+                self._condition.wait()
+
+    def _release(self, key, conn):
+        with self._condition:
+            self._idle_connections[key].append(conn)
+            self._condition.notify()
+
+
+class NifcloudConnectionPools():
+    # connection pools shared by playhouses of the same user and connection settings
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, create_pool):
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = create_pool()
+
+            return self._pools[key]
@@ -0,0 +1,52 @@
+import threading
+
+
+class NifcloudPrefetcher():
+    # describes declared requests ahead in the order modules take them, at most window requests are described and not taken yet.
+    # identical requests are described once and taken by the first module, the others get the response kept by the coalescer
+
+    def __init__(self, executor, describe_requests, window, describe, generate_key):
+        self._executor = executor
+        self._pending_requests = iter(describe_requests)
+        self._window = window
+        self._describe = describe
+        self._generate_key = generate_key
+        self._jobs = {}
+        self._submitted_keys = set()
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._submit_jobs()
+
+    def take(self, key):
+        # returns the future of the request described ahead, or None if it is not
+        with self._lock:
+            job = self._jobs.pop(key, None)
+            if job is None:
+                return None
+
+            self._submit_jobs()
+
+        return job
+
+    def cancel(self):
+        with self._lock:
+            self._pending_requests = iter(())
+
+            for job in self._jobs.values():
+                job.cancel()
+
+            self._jobs.clear()
+
+    def _submit_jobs(self):
+        while len(self._jobs) < self._window:
+            describe_request = next(self._pending_requests, None)
+            if describe_request is None:
+                return
+
+            key = self._generate_key(describe_request.region, describe_request.action, describe_request.params)
+            if key in self._submitted_keys:
+                continue
+
+            self._submitted_keys.add(key)
+            self._jobs[key] = self._executor.submit(self._describe, *describe_request)
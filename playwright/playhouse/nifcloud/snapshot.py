@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from playwright.error import PlaywrightError
+from playwright.playhouse.nifcloud.model import NifcloudFwPermission
+
+
+class NifcloudSnapshot():
+    # stores described fw groups of each user and region into sqlite, so that playbooks are generated and rules are queried offline
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS described_regions (
+            user TEXT NOT NULL,
+            region TEXT NOT NULL,
+            described REAL NOT NULL,
+            PRIMARY KEY (user, region)
+        );
+        CREATE TABLE IF NOT EXISTS fw_groups (
+            user TEXT NOT NULL,
+            region TEXT NOT NULL,
+            group_name TEXT NOT NULL,
+            availability_zone TEXT,
+            log_limit INTEGER,
+            resource TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS fw_rules (
+            user TEXT NOT NULL,
+            region TEXT NOT NULL,
+            group_name TEXT NOT NULL,
+            ip_protocol TEXT,
+            in_out TEXT,
+            cidr_ip TEXT,
+            source_group_name TEXT,
+            from_port INTEGER,
+            to_port INTEGER,
+            description TEXT
+        );
+        CREATE INDEX IF NOT EXISTS fw_groups_group_name ON fw_groups (user, region, group_name);
+        CREATE INDEX IF NOT EXISTS fw_rules_group_name ON fw_rules (user, region, group_name);
+        CREATE INDEX IF NOT EXISTS fw_rules_cidr_ip ON fw_rules (cidr_ip);
+        CREATE INDEX IF NOT EXISTS fw_rules_port ON fw_rules (from_port, to_port);
+    '''
+
+    @classmethod
+    def from_config(cls, config, snapshot_path):
+        return cls(os.path.join(config.base_dir, os.path.expanduser(snapshot_path)))
+
+    def __init__(self, path):
+        self.path = path
+
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        # regions described in parallel share the connection
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.executescript(self.SCHEMA)
+
+    def save_fw_groups(self, user, region_name, fw_groups):
+        # replaces fw groups of the user and region with the latest describe
+        group_rows = []
+        rule_rows = []
+
+        for fw_group in fw_groups:
+            # all groups are stored to be filtered offline, so optional fields of the response may be missing
+            group_name = fw_group['groupName']
+            group_rows.append((
+                user, region_name, group_name, fw_group.get('availabilityZone'), fw_group.get('groupLogLimit'), json.dumps(fw_group)))
+
+            for ip_permission in _generate_ip_permissions(fw_group):
+                rule_rows.append((
+                    user, region_name, group_name, ip_permission.ip_protocol, ip_permission.in_out,
+                    ip_permission.cidr_ip, ip_permission.group_name,
+                    _to_port(ip_permission.from_port), _to_port(ip_permission.to_port), ip_permission.description,
+                ))
+
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM fw_groups WHERE user = ? AND region = ?', (user, region_name))
+            self._connection.execute('DELETE FROM fw_rules WHERE user = ? AND region = ?', (user, region_name))
+            self._connection.executemany('INSERT INTO fw_groups VALUES (?, ?, ?, ?, ?, ?)', group_rows)
+            self._connection.executemany('INSERT INTO fw_rules VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rule_rows)
+            self._connection.execute('INSERT OR REPLACE INTO described_regions VALUES (?, ?, ?)', (user, region_name, time.time()))
+
+    def load_fw_groups(self, user, region_name):
+        # fw groups in the same structure as DescribeSecurityGroups, so that includes and excludes are applied as online
+        with self._lock:
+            described = self._connection.execute(
+                    'SELECT 1 FROM described_regions WHERE user = ? AND region = ?', (user, region_name)).fetchone()
+            rows = self._connection.execute(
+                    'SELECT resource FROM fw_groups WHERE user = ? AND region = ? ORDER BY rowid', (user, region_name)).fetchall()
+
+        if not described:
+            raise PlaywrightError('fw groups of {} in {} not found in snapshot: {}'.format(user, region_name, self.path))
+
+        return [json.loads(resource) for resource, in rows]
+
+    def get_region_names(self, user):
+        with self._lock:
+            rows = self._connection.execute('SELECT region FROM described_regions WHERE user = ? ORDER BY region', (user,)).fetchall()
+
+        if not rows:
+            raise PlaywrightError('regions of {} not found in snapshot: {}'.format(user, self.path))
+
+        return [region_name for region_name, in rows]
+
+    def close(self):
+        self._connection.close()
+
+
+def _generate_ip_permissions(fw_group):
+    for ip_permission in fw_group.get('ipPermissions') or []:
+        yield from NifcloudFwPermission.from_response(ip_permission)
+
+
+def _to_port(port):
+    # ports are stored as integer if possible, so that rules are queried by port range
+    if isinstance(port, str) and port.isdigit():
+        return int(port)
+
+    return port
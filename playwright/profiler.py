@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Profiler():
+    # records named spans and counters keyed by their args such as inspiration, module and region
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._events = []
+        self._span_totals = {}
+        self._counters = {}
+        self._thread_ids = {}
+
+    @contextmanager
+    def span(self, name, trace=True, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._record_span(name, args, start, end, trace)
+
+    def count(self, name, value=1, **args):
+        key = (name, _freeze(args))
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def generate_summary(self):
+        span_rows = [(name, _format_args(args), count, '{:.4f}'.format(seconds)) for (name, args), (count, seconds) in sorted(self._span_totals.items())]
+        counter_rows = [(name, _format_args(args), '', value) for (name, args), value in sorted(self._counters.items())]
+
+        rows = [('span', 'key', 'count', 'seconds')] + span_rows + [('counter', 'key', '', 'value')] + counter_rows
+        widths = [max(len(str(row[column])) for row in rows) for column in range(4)]
+        row_format = '{{:<{}}}  {{:<{}}}  {{:>{}}}  {{:>{}}}'.format(*widths)
+
+        return os.linesep.join(row_format.format(*row).rstrip() for row in rows)
+
+    def generate_chrome_trace(self):
+        events = list(self._events)
+
+        for (name, args), value in sorted(self._counters.items()):
+            events.append({
+                'name': name, 'ph': 'C', 'ts': 0, 'pid': os.getpid(), 'tid': 0,
+                'args': {_format_args(args) or name: value},
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.generate_chrome_trace(), f)
+
+    def _record_span(self, name, args, start, end, trace):
+        key = (name, _freeze(args))
+
+        with self._lock:
+            count, seconds = self._span_totals.get(key, (0, 0.0))
+            self._span_totals[key] = (count + 1, seconds + end - start)
+
+            if trace:
+                self._events.append({
+                    'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': self._get_thread_id(),
+                    'ts': (start - self._origin) * 1e6, 'dur': (end - start) * 1e6,
+                    'args': args,
+                })
+
+    def _get_thread_id(self):
+        ident = threading.get_ident()
+        if ident not in self._thread_ids:
+            self._thread_ids[ident] = len(self._thread_ids) + 1
+
+        return self._thread_ids[ident]
+
+
+class NullProfiler():
+    # used while profiling is disabled, does nothing
+
+    enabled = False
+
+    def span(self, name, trace=True, **args):
+        return _NULL_SPAN
+
+    def count(self, name, value=1, **args):
+        pass
+
+
+class _NullSpan():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+_profiler = NullProfiler()
+
+
+def get_profiler():
+    return _profiler
+
+
+def enable_profiler():
+    global _profiler
+
+    _profiler = Profiler()
+    return _profiler
+
+
+def _freeze(args):
+    return tuple(sorted((key, str(value)) for key, value in args.items()))
+
+
+def _format_args(args):
+    return ' '.join('{}={}'.format(key, value) for key, value in args)
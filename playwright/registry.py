@@ -0,0 +1,100 @@
+import functools
+import importlib
+import threading
+
+from playwright.error import PlaywrightUnsupportedError
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    try:
+        import importlib_metadata
+    except ImportError:
+        importlib_metadata = None
+
+
+# playhouses are registered as entry points of this group, e.g. "nifcloud = playwright.playhouse.nifcloud.playhouse:NifcloudPlayhouse"
+PLAYHOUSE_GROUP = 'playwright.playhouses'
+
+# modules of a playhouse are registered as entry points of this group formatted with the playhouse name
+MODULE_GROUP = 'playwright.modules.{}'
+
+# classes are referred by import path and imported when a config uses them,
+# so that dependencies of unused playhouses (e.g. sleety) are not loaded.
+# built-in ones are available without package metadata, e.g. in a source tree
+BUILTIN_PLAYHOUSES = {
+    'nifcloud': 'playwright.playhouse.nifcloud.playhouse:NifcloudPlayhouse',
+}
+
+BUILTIN_MODULES = {
+    'nifcloud': {
+        'nifcloud_fw': 'playwright.playhouse.nifcloud.module.fw:NifcloudModuleFw',
+    },
+}
+
+# "native" renders nodes having an emitter without templates, the output is the same
+RENDER_BACKENDS = ('template', 'native')
+
+# "region" and "group" output tasks into a file of each region or each group, imported by the playbook
+SPLIT_MODES = ('region', 'group')
+
+
+def load_playhouse(playhouse_id):
+    return _load('playhouse', playhouse_id, PLAYHOUSE_GROUP, BUILTIN_PLAYHOUSES)
+
+
+def load_module(playhouse_id, module_id):
+    return _load('module', module_id, MODULE_GROUP.format(playhouse_id), BUILTIN_MODULES.get(playhouse_id, {}))
+
+
+def _load(kind, name, group, builtins):
+    entry_points = _find_entry_points(group)
+
+    # installed entry points override built-in ones
+    if name in entry_points:
+        return entry_points[name].load()
+
+    if name in builtins:
+        return _load_class(builtins[name])
+
+    raise PlaywrightUnsupportedError('unsupported {}: {}'.format(kind, name))
+
+
+@functools.lru_cache(maxsize=None)
+def _find_entry_points(group):
+    if importlib_metadata is None:
+        return {}
+
+    entry_points = importlib_metadata.entry_points()
+
+    # entry_points() returns dict of groups before python 3.10
+    if hasattr(entry_points, 'select'):
+        selected = entry_points.select(group=group)
+    else:
+        selected = entry_points.get(group, [])
+
+    return {entry_point.name: entry_point for entry_point in selected}
+
+
+def _load_class(path):
+    module_name, class_name = path.split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class PlayhouseFactory():
+    # creates playhouses of inspirations, options shared in a run are created once for each playhouse
+
+    def __init__(self):
+        self._shared_options = {}
+        self._lock = threading.Lock()
+
+    def create(self, playhouse_id, **options):
+        playhouse_class = load_playhouse(playhouse_id)
+
+        with self._lock:
+            if playhouse_id not in self._shared_options:
+                self._shared_options[playhouse_id] = playhouse_class.create_shared_options()
+
+            shared_options = self._shared_options[playhouse_id]
+
+        return playhouse_class(**dict(shared_options, **options))
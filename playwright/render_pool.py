@@ -0,0 +1,83 @@
+import collections
+import itertools
+import multiprocessing
+
+from playwright import inspired
+
+
+class RenderPool():
+    # renders nodes in worker processes, each worker keeps its own template environment between batches
+
+    BATCH_SIZE = 64
+
+    def __init__(self, workers, bytecode_cache_dir=None):
+        self.workers = workers
+
+        # workers are not forked from the process running describe threads
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        # multiprocessing.Pool is used since ProcessPoolExecutor takes neither a context nor an initializer on python 3.6
+        self._pool = multiprocessing.get_context(start_method).Pool(workers, _init_worker, (bytecode_cache_dir,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.shutdown(terminate=exc_type is not None)
+        return False
+
+    def shutdown(self, terminate=False):
+        # batches rendered ahead are discarded after a failure
+        if terminate:
+            self._pool.terminate()
+        else:
+            self._pool.close()
+
+        self._pool.join()
+
+    def render_nodes(self, nodes, backend='template'):
+        return list(self._generate_renders(nodes, backend))
+
+    def generate_renders(self, nodes, backend='template', node_renderer=None):
+        # yields rendered text in the order of nodes
+        if not node_renderer:
+            yield from self._generate_renders(nodes, backend)
+            return
+
+        # node_renderer reuses unchanged nodes, and the rest of each chunk is rendered by workers
+        for chunk in _generate_batches(nodes, self.BATCH_SIZE * self.workers):
+            yield from node_renderer.render_nodes(chunk, backend, self.render_nodes)
+
+    def _generate_renders(self, nodes, backend):
+        # at most 2 batches per worker are rendered ahead
+        batches = _generate_batches(nodes, self.BATCH_SIZE)
+        render_jobs = collections.deque()
+
+        for batch in itertools.islice(batches, self.workers * 2):
+            render_jobs.append(self._pool.apply_async(_render_batch, (batch, backend)))
+
+        while render_jobs:
+            renders = render_jobs.popleft().get()
+
+            for batch in itertools.islice(batches, 1):
+                render_jobs.append(self._pool.apply_async(_render_batch, (batch, backend)))
+
+            yield from renders
+
+
+def _generate_batches(nodes, batch_size):
+    nodes = iter(nodes)
+
+    while True:
+        batch = list(itertools.islice(nodes, batch_size))
+        if not batch:
+            return
+
+        yield batch
+
+
+def _init_worker(bytecode_cache_dir):
+    inspired.init_template_environment(bytecode_cache_dir)
+
+
+def _render_batch(nodes, backend):
+    return [node.render(backend) for node in nodes]
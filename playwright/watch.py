@@ -0,0 +1,48 @@
+import os
+
+from playwright.config import PlaywrightConfig
+
+
+class WatchedConfig():
+    # an inspiration config kept loaded with modification times of files it is loaded from, and its last playbook
+
+    def __init__(self, inspiration_path):
+        self.inspiration_path = inspiration_path
+        self.config = None
+        self.playbook = None
+        self._vars_paths = []
+        self._stamps = None
+
+    def is_changed(self):
+        if self._stamps is None:
+            return True
+
+        return any(_stat(path) != stamp for path, stamp in self._stamps.items())
+
+    def load(self):
+        # files are stamped before loading, so that changes while loading are found at next check
+        stamps = {path: _stat(path) for path in [self.inspiration_path] + self._vars_paths}
+
+        try:
+            config = PlaywrightConfig()
+            config.load_file(self.inspiration_path)
+        except Exception:  # noqa: B902
+            # reloaded when the config or vars files of its last successful load change
+            self.config = None
+            self._stamps = stamps
+            raise
+
+        self._vars_paths = [os.path.join(config.playbooks_dir, vars_file) for vars_file in config.vars_files]
+
+        self.config = config
+        self._stamps = {path: stamps[path] if path in stamps else _stat(path) for path in [self.inspiration_path] + self._vars_paths}
+        return config
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
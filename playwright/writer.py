@@ -0,0 +1,65 @@
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def write_files(files, max_workers=None):
+    # writes {path: content} concurrently, returns paths written except unchanged ones
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda item: write_file(*item), files.items()))
+
+    return [path for path, written in zip(files, results) if written]
+
+
+def write_file(path, content):
+    # replaces the file atomically, and keeps the file and its mtime if the content is unchanged
+    try:
+        with open(path, 'r') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    return write_chunks(path, [content])
+
+
+def write_chunks(path, chunks, is_complete=None):
+    # writes chunks into a temp file, which replaces the file only if is_complete() is true after all chunks are written
+    dirname, filename = os.path.split(path)
+    os.makedirs(dirname or '.', exist_ok=True)
+
+    # not created by mkstemp, whose files are readable only by the owner, so that the umask applies as to other outputs
+    tmp_path = os.path.join(dirname, '.{}.{}.tmp'.format(filename, uuid.uuid4().hex))
+    try:
+        with open(tmp_path, 'x') as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+        if is_complete is None or is_complete():
+            os.replace(tmp_path, path)
+            return True
+    except BaseException:  # noqa: B902
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.remove(tmp_path)
+    return False
+
+
+def remove_stale_files(directory, paths, ext='.yml'):
+    # removes files not in paths and empty directories left in the directory, returns removed paths
+    keep_paths = {os.path.abspath(path) for path in paths}
+    removed_paths = []
+
+    for dirpath, dirnames, filenames in os.walk(directory, topdown=False):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if filename.endswith(ext) and os.path.abspath(path) not in keep_paths:
+                os.remove(path)
+                removed_paths.append(path)
+
+        if dirpath != directory and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+    return sorted(removed_paths)
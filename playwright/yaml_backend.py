@@ -0,0 +1,97 @@
+import functools
+import re
+from collections import OrderedDict
+
+
+import yaml
+
+try:
+    from yaml import CDumper as _BaseDumper, CSafeLoader as _BaseLoader
+    LIBYAML = True
+except ImportError:
+    from yaml import Dumper as _BaseDumper, SafeLoader as _BaseLoader
+    LIBYAML = False
+
+
+# libyaml accepts only int as width
+UNLIMITED_WIDTH = 2 ** 31 - 1
+
+# scalars consisting of these are emitted plain or single quoted, never escaped nor wrapped
+_SIMPLE_SCALAR = re.compile(r'[A-Za-z0-9_][A-Za-z0-9_./-]*(?: [A-Za-z0-9_./-]+)*\Z')
+
+_resolver = yaml.resolver.Resolver()
+
+
+class PlaywrightLoader(_BaseLoader):
+    pass
+
+
+class PlaywrightDumper(_BaseDumper):
+    pass
+
+
+class _WrappingDumper(yaml.Dumper):
+    # libyaml folds long quoted scalars differently, pure python emitter keeps wrapped output as before
+    pass
+
+
+def _represent_odict(dumper, instance):
+    return dumper.represent_mapping(u'tag:yaml.org,2002:map', instance.items())
+
+
+def _represent_str(dumper, instance):
+    # string variable quotes double quotation
+    if instance.startswith('{{') and instance.endswith('}}'):
+        return dumper.represent_scalar('tag:yaml.org,2002:str', instance, style='"')
+    else:
+        return dumper.represent_scalar('tag:yaml.org,2002:str', instance)
+
+
+PlaywrightDumper.add_representer(OrderedDict, _represent_odict)
+PlaywrightDumper.add_representer(str, _represent_str)
+_WrappingDumper.add_representer(OrderedDict, _represent_odict)
+_WrappingDumper.add_representer(str, _represent_str)
+
+
+def load(stream):
+    return yaml.load(stream, Loader=PlaywrightLoader)
+
+
+def dump(instance, default_flow_style=False, allow_unicode=True, width=None):
+    dumper = PlaywrightDumper if width == UNLIMITED_WIDTH else _WrappingDumper
+    return yaml.dump(instance, Dumper=dumper, default_flow_style=default_flow_style, allow_unicode=allow_unicode, width=width)
+
+
+def dump_flow(instance):
+    # same as dump(instance, default_flow_style=True, width=UNLIMITED_WIDTH) for a flat mapping or list, without the emitter for simple scalars
+    if isinstance(instance, dict):
+        items = [(_format_simple_scalar(key), _format_simple_scalar(value)) for key, value in instance.items()]
+        if all(key is not None and value is not None for key, value in items):
+            return '{{{}}}\n'.format(', '.join('{}: {}'.format(key, value) for key, value in items))
+    elif isinstance(instance, list):
+        items = [_format_simple_scalar(item) for item in instance]
+        if all(item is not None for item in items):
+            return '[{}]\n'.format(', '.join(items))
+
+    return dump(instance, default_flow_style=True, width=UNLIMITED_WIDTH)
+
+
+def _format_simple_scalar(value):
+    if type(value) is int:
+        return str(value)
+    elif type(value) is str:
+        return _format_simple_str(value)
+
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_simple_str(value):
+    if not _SIMPLE_SCALAR.match(value):
+        return None
+
+    # e.g. '80' or 'true' is quoted not to be loaded as other type
+    if _resolver.resolve(yaml.ScalarNode, value, (True, False)) != 'tag:yaml.org,2002:str':
+        return "'{}'".format(value)
+
+    return value
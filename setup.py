@@ -6,9 +6,10 @@ from setuptools import find_packages, setup
 
 requires = [
     'Click',
-    'future',
     'jinja2',
+    'lxml',
     'PyYAML',
+    'requests',
     'sleety',
     ]
 
@@ -31,5 +32,11 @@ setup(
     entry_points='''
         [console_scripts]
         playwright=playwright.cli:cli
+
+        [playwright.playhouses]
+        nifcloud=playwright.playhouse.nifcloud.playhouse:NifcloudPlayhouse
+
+        [playwright.modules.nifcloud]
+        nifcloud_fw=playwright.playhouse.nifcloud.module.fw:NifcloudModuleFw
     ''',
 )
@@ -0,0 +1,76 @@
+import os
+import shutil
+from contextlib import contextmanager
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from click.testing import CliRunner
+
+from playwright.cli import cli
+
+import requests
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+ERROR_RESPONSE = ('<?xml version="1.0" encoding="UTF-8"?>'
+                  '<Response><Errors><Error><Code>{}</Code><Message>{}</Message></Error></Errors><RequestID>fixture</RequestID></Response>')
+
+
+class FixtureApi():
+    # responds requests with the fixture responses of each action and region, failures are responded in order before them
+
+    def __init__(self, failures=None):
+        self.failures = list(failures) if failures else []
+        self.calls = []
+
+    def post(self, url, data=None, timeout=None, **kwargs):
+        action = parse_qs(data)['Action'][0]
+        region = urlparse(url).hostname.split('.')[1]
+        self.calls.append((action, region))
+
+        if action != 'DescribeRegions' and self.failures:
+            return create_response(*self.failures.pop(0))
+
+        filename = '{}.xml'.format(action) if action == 'DescribeRegions' else '{}.{}.xml'.format(action, region)
+        return create_response(200, read_fixture(filename, 'rb'))
+
+    def count_calls(self, action):
+        return len([call for call in self.calls if call[0] == action])
+
+    @contextmanager
+    def patch(self):
+        with mock.patch.object(requests.Session, 'post', new=self.post), mock.patch.object(requests, 'post', new=self.post):
+            yield self
+
+
+def create_response(status_code, content):
+    response = requests.Response()
+    response.status_code = status_code
+    response.encoding = 'utf-8'
+    response._content = content if isinstance(content, bytes) else content.encode('utf-8')
+    return response
+
+
+def read_fixture(filename, mode='r'):
+    with open(os.path.join(FIXTURES_DIR, filename), mode) as f:
+        return f.read()
+
+
+def copy_fixture(filename, work_dir, dest_filename=None):
+    path = os.path.join(work_dir, dest_filename or filename)
+    shutil.copy(os.path.join(FIXTURES_DIR, filename), path)
+    return path
+
+
+def invoke(args, api=None):
+    api = api if api else FixtureApi()
+
+    try:
+        runner = CliRunner(mix_stderr=False)
+    except TypeError:
+        # stderr is separated by default since click 8.2
+        runner = CliRunner()
+
+    with api.patch():
+        return runner.invoke(cli, args)
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from fixture_api import ERROR_RESPONSE, FixtureApi, copy_fixture, invoke, read_fixture
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.project_dir = os.path.join(self.work_dir, 'projects')
+        os.makedirs(os.path.join(self.project_dir, 'sub'))
+        self.expected = read_fixture('inventory.yml')
+
+        for filename in ['a.insp.yml', 'b.insp.yml', os.path.join('sub', 'c.insp.yml')]:
+            copy_fixture('inventory.insp.yml', self.project_dir, filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def generate_paths(self, *filenames):
+        return [os.path.join(self.project_dir, filename) for filename in filenames]
+
+    def assert_playbooks(self, playbook_paths):
+        for playbook_path in playbook_paths:
+            with open(playbook_path, 'r') as f:
+                self.assertEqual(f.read(), self.expected)
+
+    def test_batch(self):
+        for jobs in ['1', '3']:
+            api = FixtureApi()
+            result = invoke(['batch', '-j', jobs, self.project_dir, os.path.join(self.project_dir, '**', 'c.insp.yml')], api)
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            # written paths are printed in the order of the configs
+            playbook_paths = self.generate_paths('a.yml', 'b.yml', os.path.join('sub', 'c.yml'))
+            self.assertEqual(result.stdout.splitlines(), playbook_paths)
+            self.assert_playbooks(playbook_paths)
+
+            # configs of the same users share describe responses
+            self.assertEqual(api.count_calls('DescribeSecurityGroups'), 3)
+
+    def test_batch_failed(self):
+        with open(os.path.join(self.project_dir, 'b.insp.yml'), 'a') as f:
+            f.write('\n- [invalid\n')
+
+        result = invoke(['batch', self.project_dir])
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('b.insp.yml failed', result.stderr)
+        self.assertIn('1 inspiration config(s) failed', result.stderr)
+        # other configs are still written
+        self.assertEqual(result.stdout.splitlines(), self.generate_paths('a.yml'))
+        self.assert_playbooks(self.generate_paths('a.yml'))
+
+    def test_batch_failed_inspiration(self):
+        inspiration_paths = self.generate_paths('a.insp.yml')
+        api = FixtureApi([(400, ERROR_RESPONSE.format('Client.InvalidParameter', 'invalid'))])
+
+        result = invoke(['batch'] + inspiration_paths, api)
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('not written since inspiration(s) failed', result.stderr)
+        self.assertFalse(os.path.exists(self.generate_paths('a.yml')[0]))
+
+    def test_batch_not_found(self):
+        result = invoke(['batch', os.path.join(self.work_dir, '*.insp.yml')])
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('inspiration config not found', result.stderr)
+
+    def test_batch_same_output(self):
+        copy_fixture('inventory.insp.yml', self.project_dir, 'a.copy.insp.yml')
+
+        result = invoke(['batch', self.project_dir])
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('output the same playbook', result.stderr)
+        self.assertFalse(os.path.exists(self.generate_paths('a.yml')[0]))
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from fixture_api import FixtureApi, copy_fixture, invoke, read_fixture
+
+from playwright.cache import MemoryResponseCache, ResponseCache
+from playwright.config import PlaywrightConfig
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.work_dir, 'cache')
+        self.loads = []
+
+        patcher = mock.patch('playwright.cache.time.time', return_value=1000.0)
+        self.time = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def load(self, response='response'):
+        def load():
+            self.loads.append(response)
+            return response
+        return load
+
+    def test_fetch(self):
+        cache = ResponseCache(self.cache_dir, ttl=10)
+
+        self.assertEqual(cache.fetch(['key'], self.load({'a': [1]})), {'a': [1]})
+        self.assertEqual(ResponseCache(self.cache_dir, ttl=10).fetch(['key'], self.load()), {'a': [1]})
+        self.assertEqual(cache.fetch(['other'], self.load('other')), 'other')
+
+        self.assertEqual(self.loads, [{'a': [1]}, 'other'])
+
+    def test_ttl(self):
+        cache = ResponseCache(self.cache_dir, ttl=10)
+        cache.fetch(['key'], self.load('old'))
+
+        self.time.return_value = 1010.0
+        self.assertEqual(cache.fetch(['key'], self.load('new')), 'old')
+        self.assertEqual(cache.with_ttl(5).fetch(['key'], self.load('new')), 'new')
+
+        self.time.return_value = 1021.0
+        self.assertEqual(cache.fetch(['key'], self.load('newer')), 'newer')
+
+    def test_refresh(self):
+        ResponseCache(self.cache_dir, ttl=10).fetch(['key'], self.load('old'))
+
+        with mock.patch('playwright.cache._RUN_STARTED', 1001.0):
+            cache = ResponseCache(self.cache_dir, ttl=10, refresh=True)
+            self.time.return_value = 1002.0
+
+            # responses cached before the run are ignored, and those cached in the run are shared
+            self.assertEqual(cache.fetch(['key'], self.load('new')), 'new')
+            self.assertEqual(cache.fetch(['key'], self.load('newer')), 'new')
+
+    def test_evict(self):
+        cache = ResponseCache(self.cache_dir, ttl=10)
+
+        for index, key in enumerate(['a', 'b', 'c']):
+            cache.fetch([key], self.load(key))
+            path = cache._generate_path([key])
+            os.utime(path, (index, index))
+
+        # reading marks a as recently used
+        cache.fetch(['a'], self.load())
+        entry_size = os.path.getsize(cache._generate_path(['a']))
+
+        cache.max_size = entry_size * 2
+        cache.fetch(['d'], self.load('d'))
+
+        # least recently used responses are removed
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), sorted(os.path.basename(cache._generate_path([key])) for key in ['a', 'd']))
+
+    def test_from_config(self):
+        config = PlaywrightConfig()
+        config.load_file(copy_fixture('inventory.insp.yml', self.work_dir))
+
+        # not used unless cache_ttl is set
+        self.assertIsNone(ResponseCache.from_config(config))
+
+        config._playwright_options = {'cache_ttl': '60', 'cache_dir': 'cache', 'cache_max_size': 1024}
+        cache = ResponseCache.from_config(config, refresh=True)
+
+        self.assertEqual(cache.cache_dir, self.cache_dir)
+        self.assertEqual((cache.ttl, cache.max_size, cache.refresh), (60, 1024, True))
+
+
+class TestMemoryResponseCache(unittest.TestCase):
+
+    def test_fetch(self):
+        cache = MemoryResponseCache()
+
+        self.assertEqual(cache.fetch({'a': 1, 'b': 2}, lambda: 'response'), 'response')
+        self.assertEqual(cache.with_ttl(0).fetch({'b': 2, 'a': 1}, lambda: 'other'), 'response')
+
+        cache.clear()
+        self.assertEqual(cache.fetch({'a': 1, 'b': 2}, lambda: 'other'), 'other')
+
+
+class TestInspireCache(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = os.path.join(self.work_dir, 'inventory.insp.yml')
+        self.expected = read_fixture('inventory.yml') + '\n'
+
+        with open(self.inspiration_path, 'w') as f:
+            f.write(read_fixture('inventory.insp.yml'))
+            f.write('\nplaywright_options:\n  cache_ttl: 600\n  cache_dir: cache\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def inspire(self, *args):
+        api = FixtureApi()
+        result = invoke(['inspire'] + list(args) + [self.inspiration_path], api)
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.stdout, self.expected)
+        return api
+
+    def test_inspire(self):
+        self.assertEqual(self.inspire().count_calls('DescribeSecurityGroups'), 3)
+        self.assertEqual(self.inspire().calls, [])
+
+        self.assertEqual(self.inspire('--no-cache').count_calls('DescribeSecurityGroups'), 3)
+        with mock.patch('playwright.cache._RUN_STARTED', time.time()):
+            self.assertEqual(self.inspire('--refresh').count_calls('DescribeSecurityGroups'), 3)
+        self.assertEqual(self.inspire().calls, [])
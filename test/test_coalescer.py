@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from fixture_api import FixtureApi, invoke
+
+from playwright.coalescer import RequestCoalescer
+
+
+CONFIG = '''---
+
+vars:
+  nifcloud_users:
+    fixture:
+      access_key: FIXTURE_ACCESS_KEY
+      secret_access_key: FIXTURE_SECRET_ACCESS_KEY
+
+inspirations:
+  - playhouse: nifcloud
+    user: fixture
+    regions: all
+    modules:
+      - module: nifcloud_fw
+        includes:
+          - key: groupName
+            regexp: ^web
+      - module: nifcloud_fw
+        includes:
+          - key: groupName
+            regexp: ^db
+      - module: nifcloud_fw
+        excludes:
+          - key: groupName
+            regexp: ^(web|db)
+  - playhouse: nifcloud
+    user: fixture
+    regions:
+      - name: jp-east-1
+    modules:
+      - module: nifcloud_fw
+'''
+
+
+class TestRequestCoalescer(unittest.TestCase):
+
+    def setUp(self):
+        self.coalescer = RequestCoalescer()
+        self.loads = []
+
+    def load(self):
+        self.loads.append(None)
+        return len(self.loads)
+
+    def test_fetch_not_kept(self):
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (1, False))
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (2, False))
+
+    def test_fetch_kept_for_expected(self):
+        self.coalescer.expect(['key'])
+        self.coalescer.expect(['key'])
+
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (1, False))
+        self.coalescer.release(['key'])
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (1, True))
+        self.coalescer.release(['key'])
+
+        # released by all expected consumers
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (2, False))
+
+    def test_fetch_released_before_fetch(self):
+        self.coalescer.expect(['key'])
+        self.coalescer.release(['key'])
+
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (1, False))
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (2, False))
+
+    def test_fetch_failure_not_kept(self):
+        def fail():
+            raise ValueError('failed')
+
+        self.coalescer.expect(['key'])
+
+        with self.assertRaises(ValueError):
+            self.coalescer.fetch(['key'], fail)
+
+        self.assertEqual(self.coalescer.fetch(['key'], self.load), (1, False))
+
+    def test_fetch_in_flight(self):
+        loading = threading.Event()
+        loaded = threading.Event()
+        results = []
+
+        def slow_load():
+            loading.set()
+            loaded.wait()
+            return 'response'
+
+        thread = threading.Thread(target=lambda: results.append(self.coalescer.fetch(['key'], slow_load)))
+        thread.start()
+        loading.wait()
+
+        shared_thread = threading.Thread(target=lambda: results.append(self.coalescer.fetch(['key'], self.load)))
+        shared_thread.start()
+        loaded.set()
+        thread.join()
+        shared_thread.join()
+
+        self.assertEqual(sorted(results), [('response', False), ('response', True)])
+        self.assertEqual(self.loads, [])
+
+
+class TestCoalescedDescribe(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def write_config(self, filename):
+        path = os.path.join(self.work_dir, filename)
+        with open(path, 'w') as f:
+            f.write(CONFIG)
+        return path
+
+    def test_inspire(self):
+        inspiration_path = self.write_config('dedup.insp.yml')
+
+        for jobs in ['1', '2']:
+            api = FixtureApi()
+            result = invoke(['inspire', '-j', jobs, inspiration_path], api)
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertEqual(api.count_calls('DescribeRegions'), 1)
+            # modules and inspirations of the same user describe each region once
+            self.assertEqual(api.count_calls('DescribeSecurityGroups'), 2)
+
+    def test_batch(self):
+        inspiration_paths = [self.write_config('{}.insp.yml'.format(name)) for name in ['a', 'b', 'c']]
+
+        for jobs in ['1', '3']:
+            api = FixtureApi()
+            result = invoke(['batch', '-j', jobs] + inspiration_paths, api)
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertEqual(api.count_calls('DescribeRegions'), 1)
+            self.assertEqual(api.count_calls('DescribeSecurityGroups'), 2)
@@ -0,0 +1,79 @@
+import unittest
+
+from playwright.error import PlaywrightUnsupportedError
+from playwright.filter import ResourceFilter
+
+
+FW_GROUPS = [
+    {
+        'groupName': 'web',
+        'groupLogLimit': 1000,
+        'isDefault': True,
+        'ipPermissions': [
+            {'ipProtocol': 'TCP', 'fromPort': 443, 'ipRanges': [{'cidrIp': '0.0.0.0/0'}]},
+            {'ipProtocol': 'ANY', 'groups': [{'groupName': 'db'}]},
+        ],
+    },
+    {
+        'groupName': 'DB',
+        'groupLogLimit': 100000,
+        'isDefault': False,
+        'ipPermissions': [
+            {'ipProtocol': 'TCP', 'fromPort': 3306, 'ipRanges': None, 'groups': [{'groupName': 'web'}]},
+        ],
+    },
+    {'groupName': 'empty'},
+]
+
+
+def _filter_names(includes=None, excludes=None):
+    return [fw_group['groupName'] for fw_group in ResourceFilter(includes, excludes).filter(FW_GROUPS)]
+
+
+class TestResourceFilter(unittest.TestCase):
+
+    def test_no_rules(self):
+        self.assertEqual(_filter_names(), ['web', 'DB', 'empty'])
+        self.assertEqual(_filter_names(includes=[]), [])
+        self.assertEqual(_filter_names(excludes=[]), ['web', 'DB', 'empty'])
+
+    def test_includes_and_excludes(self):
+        includes = [{'key': 'groupName', 'regexp': '^w'}, {'key': 'groupName', 'regexp': '^e'}]
+        excludes = [{'key': 'groupName', 'regexp': 'y$'}]
+
+        self.assertEqual(_filter_names(includes, excludes), ['web'])
+
+    def test_from_config(self):
+        resource_filter = ResourceFilter.from_config({'module': 'nifcloud_fw', 'excludes': [{'key': 'groupName', 'regexp': '^web$'}]})
+
+        self.assertEqual([fw_group['groupName'] for fw_group in resource_filter.filter(FW_GROUPS)], ['DB', 'empty'])
+
+    def test_nested_keys(self):
+        # a resource matches if one of the values matches, and resources missing the key do not match
+        self.assertEqual(_filter_names(includes=[{'key': 'ipPermissions[].ipRanges[].cidrIp', 'regexp': r'^0\.0\.0\.0/0$'}]), ['web'])
+        self.assertEqual(_filter_names(includes=[{'key': 'ipPermissions[].groups[].groupName', 'regexp': '^web$'}]), ['DB'])
+        self.assertEqual(_filter_names(excludes=[{'key': 'ipPermissions[].ipProtocol', 'regexp': '^ANY$'}]), ['DB', 'empty'])
+
+    def test_scalar_values(self):
+        self.assertEqual(_filter_names(includes=[{'key': 'groupLogLimit', 'regexp': '^1000$'}]), ['web'])
+        self.assertEqual(_filter_names(includes=[{'key': 'isDefault', 'regexp': '^false$'}]), ['DB'])
+        self.assertEqual(_filter_names(includes=[{'key': 'ipPermissions[].fromPort', 'regexp': '^3306$'}]), ['DB'])
+
+        with self.assertRaises(PlaywrightUnsupportedError):
+            _filter_names(includes=[{'key': 'ipPermissions', 'regexp': '.'}])
+
+    def test_inline_flags(self):
+        # inline flags apply only to their own pattern
+        includes = [{'key': 'groupName', 'regexp': '(?i)^db$'}, {'key': 'groupName', 'regexp': '^WEB$'}, {'key': 'groupName', 'regexp': '^EMPTY$'}]
+
+        self.assertEqual(_filter_names(includes), ['DB'])
+
+    def test_backreferences_and_group_names(self):
+        includes = [
+            {'key': 'groupName', 'regexp': r'^(\w)\1'},
+            {'key': 'groupName', 'regexp': '^(?P<head>w)'},
+            {'key': 'groupName', 'regexp': '^(?P<head>D)'},
+            {'key': 'groupName', 'regexp': '(?P<tail>y)(?P=tail)'},
+        ]
+
+        self.assertEqual(_filter_names(includes), ['web', 'DB'])
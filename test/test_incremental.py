@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from fixture_api import ERROR_RESPONSE, FixtureApi, copy_fixture, invoke, read_fixture
+
+from playwright.incremental import IncrementalRenderer
+
+
+class FakeNode():
+
+    def __init__(self, key, content, renders):
+        self.key = key
+        self.template = 'task.yml.j2'
+        self.content = content
+        self._renders = renders
+
+    def render(self, backend='template'):
+        self._renders.append(self.key)
+        return '{}: {}'.format(self.key, self.content)
+
+
+class TestIncrementalRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.state_path = IncrementalRenderer.generate_state_path(os.path.join(self.work_dir, 'playbook.yml'))
+        self.renders = []
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def render(self, contents):
+        renderer = IncrementalRenderer(self.state_path)
+        renderd = renderer.render_nodes([FakeNode(key, content, self.renders) for key, content in contents])
+        renderer.save()
+
+        return renderer, renderd
+
+    def test_generate_state_path(self):
+        self.assertEqual(self.state_path, os.path.join(self.work_dir, '.playbook.yml.inspired.json'))
+
+    def test_render_nodes(self):
+        renderer, renderd = self.render([('a', 1), ('b', 2)])
+        self.assertEqual(renderd, ['a: 1', 'b: 2'])
+        self.assertEqual((renderer.added, renderer.changed, renderer.unchanged, renderer.removed), (['a', 'b'], [], [], []))
+
+        del self.renders[:]
+        renderer, renderd = self.render([('a', 1), ('b', 3), ('c', 4)])
+
+        # unchanged nodes are not rendered again
+        self.assertEqual(renderd, ['a: 1', 'b: 3', 'c: 4'])
+        self.assertEqual(self.renders, ['b', 'c'])
+        self.assertEqual((renderer.added, renderer.changed, renderer.unchanged, renderer.removed), (['c'], ['b'], ['a'], []))
+
+        renderer, renderd = self.render([('c', 4)])
+        self.assertEqual(renderer.removed, ['a', 'b'])
+
+    def test_nodes_without_key(self):
+        self.render([(None, 1)])
+        renderer, renderd = self.render([(None, 1)])
+
+        self.assertEqual(renderd, ['None: 1'])
+        self.assertEqual(self.renders, [None, None])
+        self.assertEqual(renderer.unchanged, [])
+
+    def test_render_nodes_by_function(self):
+        self.render([('a', 1)])
+        renderer = IncrementalRenderer(self.state_path)
+        nodes = [FakeNode(key, content, self.renders) for key, content in [('a', 1), ('b', 2)]]
+
+        renderd = renderer.render_nodes(nodes, 'native', lambda targets, backend: ['{} by {}'.format(node.key, backend) for node in targets])
+
+        self.assertEqual(renderd, ['a: 1', 'b by native'])
+
+    def test_state_of_other_version(self):
+        self.render([('a', 1)])
+
+        with mock.patch('playwright.incremental.__version__', 'other'):
+            renderer, renderd = self.render([('a', 1)])
+
+        self.assertEqual(renderer.added, ['a'])
+        self.assertEqual(self.renders, ['a', 'a'])
+
+
+class TestInspireIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = copy_fixture('inventory.insp.yml', self.work_dir)
+        self.playbook_path = os.path.join(self.work_dir, 'inventory.yml')
+        self.state_path = IncrementalRenderer.generate_state_path(self.playbook_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def read(self, path):
+        with open(path, 'r') as f:
+            return f.read()
+
+    def test_inspire(self):
+        result = invoke(['inspire', '--incremental', '-f', self.inspiration_path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('unchanged: 0, changed: 0, added: 11, removed: 0', result.stderr)
+
+        for args in [[], ['--stream'], ['--render-backend', 'native']]:
+            result = invoke(['inspire', '--incremental', '-f'] + args + [self.inspiration_path])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn('unchanged: 11, changed: 0, added: 0, removed: 0', result.stderr)
+            self.assertEqual(self.read(self.playbook_path), read_fixture('inventory.yml'))
+
+    def test_inspire_failed(self):
+        invoke(['inspire', '--incremental', '-f', self.inspiration_path])
+        state = self.read(self.state_path)
+
+        api = FixtureApi([(400, ERROR_RESPONSE.format('Client.InvalidParameter', 'invalid'))])
+        result = invoke(['inspire', '--incremental', '-f', self.inspiration_path], api)
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('removed: ', result.stderr)
+        # tasks of the failed inspiration are missing, so the previous state is kept
+        self.assertEqual(self.read(self.state_path), state)
+
+    def test_requires_output_file(self):
+        result = invoke(['inspire', '--incremental', self.inspiration_path])
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('--incremental requires --output-file', result.stderr)
@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from fixture_api import ERROR_RESPONSE, FixtureApi, copy_fixture, invoke, read_fixture
+
+import yaml
+
+
+class TestInspire(unittest.TestCase):
+    # inventory.yml is the playbook of the fixture inventory generated before render backends were added
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = copy_fixture('inventory.insp.yml', self.work_dir)
+        self.playbook_path = os.path.join(self.work_dir, 'inventory.yml')
+        self.expected = read_fixture('inventory.yml')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_inspire(self):
+        result = invoke(['inspire', self.inspiration_path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.stdout, self.expected + '\n')
+
+    def test_inspire_native_backend(self):
+        result = invoke(['inspire', '--render-backend', 'native', self.inspiration_path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.stdout, self.expected + '\n')
+
+    def test_inspire_output_file(self):
+        for render_backend in ['template', 'native']:
+            result = invoke(['inspire', '-f', '--render-backend', render_backend, self.inspiration_path])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(self.playbook_path, 'r') as f:
+                self.assertEqual(f.read(), self.expected)
+
+    def test_inspire_stream(self):
+        for render_backend in ['template', 'native']:
+            result = invoke(['inspire', '--stream', '--render-backend', render_backend, self.inspiration_path])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertEqual(result.stdout, self.expected + '\n')
+            self.assertEqual(result.stderr, '')
+
+    def test_inspire_stream_output_file(self):
+        result = invoke(['inspire', '--stream', '-f', self.inspiration_path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        with open(self.playbook_path, 'r') as f:
+            self.assertEqual(f.read(), self.expected)
+
+    def test_inspire_jobs(self):
+        for jobs in ['2', '4']:
+            result = invoke(['inspire', '-j', jobs, self.inspiration_path])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            # inspirations run in parallel are output in the order of the config
+            self.assertEqual(result.stdout, self.expected + '\n')
+
+    def test_inspire_failed_output_file(self):
+        with open(self.playbook_path, 'w') as f:
+            f.write('previous')
+
+        for args in [['-f'], ['-f', '--stream'], ['-f', '-j', '2']]:
+            result = invoke(['inspire'] + args + [self.inspiration_path], FixtureApi([(400, ERROR_RESPONSE.format('Client.InvalidParameter', 'invalid'))]))
+
+            self.assertNotEqual(result.exit_code, 0)
+            self.assertRegex(result.stderr, r'inspiration\[[01]\] failed')
+            self.assertIn('not written since inspiration(s) failed', result.stderr)
+            # tasks of the failed inspiration are missing, so the previous playbook is kept
+            with open(self.playbook_path, 'r') as f:
+                self.assertEqual(f.read(), 'previous')
+            self.assertEqual(sorted(os.listdir(self.work_dir)), ['inventory.insp.yml', 'inventory.yml'])
+
+
+class TestInspireSplit(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = copy_fixture('inventory.insp.yml', self.work_dir)
+        self.playbook_path = os.path.join(self.work_dir, 'inventory.yml')
+        self.tasks_dir = os.path.join(self.work_dir, 'inventory.tasks')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def inspire(self, split):
+        result = invoke(['inspire', '--split', split, '-f', self.inspiration_path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result
+
+    def load_tasks(self):
+        # tasks of the playbook with imported task files expanded
+        with open(self.playbook_path, 'r') as f:
+            tasks = yaml.safe_load(f)[0]['tasks']
+
+        expanded_tasks = []
+        for task in tasks:
+            if 'import_tasks' not in task:
+                expanded_tasks.append(task)
+                continue
+
+            with open(os.path.join(self.work_dir, task['import_tasks']), 'r') as f:
+                expanded_tasks.extend(yaml.safe_load(f))
+
+        return expanded_tasks
+
+    def list_task_files(self):
+        return sorted(os.path.relpath(os.path.join(dirpath, filename), self.tasks_dir)
+                      for dirpath, _, filenames in os.walk(self.tasks_dir) for filename in filenames)
+
+    def test_split_region(self):
+        result = self.inspire('region')
+
+        self.assertIn('written: 4, unchanged: 0, removed: 0', result.stderr)
+        self.assertEqual(self.list_task_files(), [os.path.join('0', 'jp-east-1.yml'), os.path.join('0', 'jp-west-1.yml'), os.path.join('1', 'jp-east-1.yml')])
+        # tasks are imported in the same order as the playbook without split
+        self.assertEqual(self.load_tasks(), yaml.safe_load(read_fixture('inventory.yml'))[0]['tasks'])
+
+        result = self.inspire('region')
+        self.assertIn('written: 0, unchanged: 4, removed: 0', result.stderr)
+
+    def test_split_group(self):
+        self.inspire('region')
+        result = self.inspire('group')
+
+        # task files of regions are replaced by those of groups
+        self.assertIn('written: 12, unchanged: 0, removed: 3', result.stderr)
+        self.assertIn(os.path.join('0', 'jp-east-1', 'web', 'fw_ip_permissions.yml'), self.list_task_files())
+        self.assertEqual(len(self.list_task_files()), 11)
+        self.assertEqual(self.load_tasks(), yaml.safe_load(read_fixture('inventory.yml'))[0]['tasks'])
+
+    def test_split_usage(self):
+        for args in [['--split', 'region'], ['--split', 'region', '-f', '--stream']]:
+            result = invoke(['inspire'] + args + [self.inspiration_path])
+
+            self.assertEqual(result.exit_code, 2)
+            self.assertFalse(os.path.exists(self.tasks_dir))
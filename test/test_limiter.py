@@ -0,0 +1,80 @@
+import unittest
+from unittest import mock
+
+from playwright.limiter import AdaptiveRateLimiter, AdaptiveRateLimiters
+
+
+class FakeClock():
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('playwright.limiter.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_acquire_burst(self):
+        limiter = AdaptiveRateLimiter(rate=10.0, max_rate=10.0)
+
+        for _ in range(10):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        limiter.acquire()
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.1)
+
+    def test_acquire_refill(self):
+        limiter = AdaptiveRateLimiter(rate=2.0, max_rate=2.0)
+
+        limiter.acquire()
+        limiter.acquire()
+        self.clock.now += 1.0
+        limiter.acquire()
+        limiter.acquire()
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_throttle(self):
+        limiter = AdaptiveRateLimiter(rate=1.0, min_rate=0.3, max_rate=10.0)
+
+        with mock.patch('playwright.limiter.random') as random:
+            random.uniform.return_value = 0.25
+            limiter.throttle(1)
+            limiter.throttle(2)
+
+        self.assertEqual(limiter.rate, 0.3)
+        self.assertEqual(self.clock.sleeps, [0.25, 0.25])
+        self.assertEqual(random.uniform.call_args_list, [mock.call(0, 1.0), mock.call(0, 2.0)])
+
+    def test_succeed(self):
+        limiter = AdaptiveRateLimiter(rate=5.0, max_rate=10.0)
+
+        for _ in range(10):
+            limiter.succeed()
+
+        self.assertEqual(limiter.rate, 10.0)
+
+
+class TestAdaptiveRateLimiters(unittest.TestCase):
+
+    def test_get(self):
+        limiters = AdaptiveRateLimiters()
+
+        limiter = limiters.get('key', AdaptiveRateLimiter)
+
+        self.assertIs(limiters.get('key', AdaptiveRateLimiter), limiter)
+        self.assertIsNot(limiters.get('other', AdaptiveRateLimiter), limiter)
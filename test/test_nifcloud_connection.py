@@ -0,0 +1,88 @@
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+from fixture_api import ERROR_RESPONSE, FixtureApi, create_response
+
+from playwright.playhouse.nifcloud.connection import NifcloudComputingConnection, NifcloudComputingHttpError
+
+import requests
+
+from sleety import computing
+from sleety.computing.connection import ComputingConnection
+from sleety.computing.error import SleetyComputingResponseError
+from sleety.region import NifcloudRegion
+
+
+class RecordingApi(FixtureApi):
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingApi, self).__init__(*args, **kwargs)
+        self.requests = []
+
+    def session_post(self, session, url, data=None, timeout=None, **kwargs):
+        self.requests.append((session, url, data, timeout))
+        return self.post(url, data, timeout)
+
+    def requests_post(self, url, data=None, timeout=None, **kwargs):
+        self.requests.append((None, url, data, timeout))
+        return self.post(url, data, timeout)
+
+    @contextmanager
+    def patch(self):
+        def session_post(session, *args, **kwargs):
+            return self.session_post(session, *args, **kwargs)
+
+        with mock.patch.object(requests.Session, 'post', new=session_post), mock.patch.object(requests, 'post', new=self.requests_post):
+            yield self
+
+
+class TestNifcloudComputingConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.region = NifcloudRegion('jp-east-1')
+
+    def create_connection(self, connection_class=NifcloudComputingConnection):
+        return connection_class('FIXTURE_ACCESS_KEY', 'FIXTURE_SECRET_ACCESS_KEY', self.region, timeout=10)
+
+    def test_session_reused(self):
+        api = RecordingApi()
+        conn = self.create_connection()
+
+        with api.patch():
+            computing.fw.describe_fw_groups(conn)
+            fw_groups = computing.fw.describe_fw_groups(conn)
+
+        self.assertEqual([fw_group['groupName'] for fw_group in fw_groups], ['web', 'db', 'empty', 'tmp9'])
+        self.assertEqual([session for session, _, _, _ in api.requests], [conn.session, conn.session])
+
+    def test_same_request_as_sleety(self):
+        api = RecordingApi()
+
+        with api.patch():
+            computing.fw.describe_fw_groups(self.create_connection(ComputingConnection), {'GroupName.1': 'web'})
+            computing.fw.describe_fw_groups(self.create_connection(), {'GroupName.1': 'web'})
+
+        sleety_request, request = api.requests
+        self.assertIsNone(sleety_request[0])
+        self.assertEqual(request[1:], sleety_request[1:])
+
+    def test_error_response(self):
+        api = RecordingApi([(400, ERROR_RESPONSE.format('Client.InvalidParameter', 'invalid'))])
+
+        with api.patch(), mock.patch('builtins.print') as print_:
+            with self.assertRaises(SleetyComputingResponseError) as context:
+                computing.fw.describe_fw_groups(self.create_connection())
+
+        self.assertEqual(context.exception.error_code, 'Client.InvalidParameter')
+        # status is not printed into the playbook written to stdout
+        print_.assert_not_called()
+
+    def test_http_error(self):
+        conn = self.create_connection()
+
+        with mock.patch.object(requests.Session, 'post', return_value=create_response(503, '<html>503 Service Unavailable</html>')):
+            with self.assertRaises(NifcloudComputingHttpError) as context:
+                computing.fw.describe_fw_groups(conn)
+
+        self.assertEqual(context.exception.status_code, 503)
@@ -0,0 +1,129 @@
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+from unittest import mock
+
+from fixture_api import invoke, read_fixture
+
+from playwright.config import PlaywrightConfig
+from playwright.error import PlaywrightUnsupportedError
+from playwright.playhouse.nifcloud.model import NifcloudUser
+from playwright.playhouse.nifcloud.module.fw import NifcloudModuleFw
+
+from sleety.region import NifcloudRegion
+
+import yaml
+
+
+class DescribedResources(list):
+    # weakly referable list of fw groups
+    pass
+
+
+class TestNifcloudModuleFw(unittest.TestCase):
+
+    def create_module(self, describe_workers):
+        config = PlaywrightConfig()
+        config._playwright_options = {'describe_workers': describe_workers}
+
+        playhouse = mock.Mock(config=config, user=NifcloudUser(regions=[NifcloudRegion(name) for name in ['jp-west-1', 'jp-east-1', 'jp-east-2']]))
+        playhouse.is_describing_ahead.return_value = False
+
+        module = NifcloudModuleFw(playhouse, {'module': 'nifcloud_fw'})
+        module._extract_resources_with_region = lambda region: DescribedResources([{'groupName': region.name}])
+
+        return module
+
+    def test_generate_resources(self):
+        for describe_workers in [1, 2]:
+            resources = list(self.create_module(describe_workers)._generate_resources())
+
+            self.assertEqual(resources, [
+                ('jp-east-1', [{'groupName': 'jp-east-1'}]),
+                ('jp-east-2', [{'groupName': 'jp-east-2'}]),
+                ('jp-west-1', [{'groupName': 'jp-west-1'}]),
+            ])
+
+    def test_generate_resources_released(self):
+        for describe_workers in [1, 2]:
+            generator = self.create_module(describe_workers)._generate_resources()
+            region_name, resources = next(generator)
+            resources_ref = weakref.ref(resources)
+
+            # the generator does not keep resources consumed by the caller
+            del resources
+            gc.collect()
+
+            self.assertEqual(region_name, 'jp-east-1')
+            self.assertIsNone(resources_ref())
+            generator.close()
+
+
+class TestNifcloudModuleFwLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = os.path.join(self.work_dir, 'inventory.insp.yml')
+
+        with open(self.inspiration_path, 'w') as f:
+            f.write(read_fixture('inventory.insp.yml').replace('      - module: nifcloud_fw\n', '      - module: nifcloud_fw\n        task_mode: loop\n'))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def inspire(self, *args):
+        result = invoke(['inspire'] + list(args) + [self.inspiration_path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result.stdout
+
+    def extract_group_items(self, tasks):
+        # {(endpoint, group name, task tag): parameters and tags} of tasks in group mode
+        items = {}
+
+        for task in tasks:
+            local_action = task['local_action']
+            task_tag = 'nifcloud_fw_ip_permissions' if 'ip_permissions' in local_action else 'nifcloud_fw_group'
+            keys = ['ip_permissions'] if task_tag == 'nifcloud_fw_ip_permissions' else ['availability_zone', 'log_limit']
+
+            item = {key: local_action[key] for key in keys}
+            item['tags'] = task['tags']
+            items[(local_action['endpoint'], local_action['group_name'], task_tag)] = item
+
+        return items
+
+    def extract_loop_items(self, tasks):
+        items = {}
+
+        for task in tasks:
+            local_action = task['local_action']
+            task_tag, = [tag for tag in task['tags'] if tag not in ('nifcloud_fw', 'always')]
+            loop_items, = task['vars'].values()
+
+            for loop_item in loop_items:
+                item = dict(loop_item)
+                group_name = item.pop('group_name')
+                items[(local_action['endpoint'], group_name, task_tag)] = item
+
+        return items
+
+    def test_loop(self):
+        playbook = self.inspire()
+
+        self.assertEqual(self.inspire('--render-backend', 'native'), playbook)
+
+        # items of looped tasks have the same parameters and tags as tasks in group mode
+        tasks = yaml.safe_load(playbook)[0]['tasks']
+        group_tasks = yaml.safe_load(read_fixture('inventory.yml'))[0]['tasks']
+
+        self.assertEqual(len(tasks), 6)
+        self.assertEqual(self.extract_loop_items(tasks), self.extract_group_items(group_tasks))
+        for task in tasks:
+            self.assertEqual(task['when'], NifcloudModuleFw.LOOP_ITEM_CONDITION)
+
+    def test_unsupported_task_mode(self):
+        with self.assertRaises(PlaywrightUnsupportedError):
+            NifcloudModuleFw(mock.Mock(), {'module': 'nifcloud_fw', 'task_mode': 'unknown'})
@@ -0,0 +1,73 @@
+import unittest
+
+from playwright.playhouse.nifcloud.model import NifcloudFwGroup, NifcloudFwPermission
+
+
+FW_GROUP = {
+    'groupName': 'web',
+    'availabilityZone': 'east-11',
+    'groupLogLimit': 1000,
+    'ipPermissions': [
+        {
+            'ipProtocol': 'TCP', 'inOut': 'IN', 'fromPort': 443, 'toPort': None, 'description': 'https',
+            'ipRanges': [{'cidrIp': '10.0.0.0/16'}, {'cidrIp': '0.0.0.0/0'}],
+            'groups': [{'groupName': 'db'}],
+        },
+        {'ipProtocol': 'ANY', 'inOut': 'OUT', 'ipRanges': [{'cidrIp': '0.0.0.0/0'}]},
+        # items without ip ranges nor groups are not converted
+        {'ipProtocol': 'ICMP', 'inOut': 'IN', 'ipRanges': None, 'groups': []},
+    ],
+}
+
+
+class TestNifcloudFwGroup(unittest.TestCase):
+
+    def test_from_response(self):
+        fw_group = NifcloudFwGroup.from_response(FW_GROUP)
+
+        self.assertEqual((fw_group.group_name, fw_group.availability_zone, fw_group.log_limit), ('web', 'east-11', 1000))
+        self.assertEqual([ip_permission.to_dict() for ip_permission in fw_group.ip_permissions], [
+            {'ip_protocol': 'ANY', 'in_out': 'OUT', 'cidr_ip': '0.0.0.0/0'},
+            {'ip_protocol': 'TCP', 'in_out': 'IN', 'cidr_ip': '0.0.0.0/0', 'from_port': 443, 'description': 'https'},
+            {'ip_protocol': 'TCP', 'in_out': 'IN', 'cidr_ip': '10.0.0.0/16', 'from_port': 443, 'description': 'https'},
+            {'ip_protocol': 'TCP', 'in_out': 'IN', 'group_name': 'db', 'from_port': 443, 'description': 'https'},
+        ])
+
+    def test_from_response_without_ip_permissions(self):
+        for ip_permissions in [{}, {'ipPermissions': None}, {'ipPermissions': []}]:
+            fw_group = NifcloudFwGroup.from_response(dict({'groupName': 'empty', 'availabilityZone': 'east-11', 'groupLogLimit': 1000}, **ip_permissions))
+
+            self.assertIsNone(fw_group.ip_permissions)
+
+    def test_slots(self):
+        fw_group = NifcloudFwGroup.from_response(FW_GROUP)
+
+        with self.assertRaises(AttributeError):
+            fw_group.unknown = None
+        with self.assertRaises(AttributeError):
+            fw_group.ip_permissions[0].unknown = None
+
+
+class TestNifcloudFwPermission(unittest.TestCase):
+
+    def test_sort_key(self):
+        # rows created from a response and created directly are sorted alike
+        ip_permission = next(NifcloudFwPermission.from_response({
+            'ipProtocol': 'TCP', 'inOut': 'IN', 'fromPort': 22, 'toPort': 23, 'groups': [{'groupName': 'db'}],
+        }))
+
+        self.assertEqual(ip_permission.sort_key, NifcloudFwPermission('TCP', 'IN', 22, 23, group_name='db').sort_key)
+
+    def test_port_order(self):
+        ports = [8080, '443', None, 443, 22, 'any']
+        ip_permissions = [NifcloudFwPermission('TCP', 'IN', from_port=port, cidr_ip='0.0.0.0/0') for port in ports]
+
+        # missing ports come first, int ports are in numeric order followed by other ports
+        sorted_ports = [ip_permission.from_port for ip_permission in sorted(ip_permissions, key=NifcloudFwPermission.get_sort_key)]
+        self.assertEqual(sorted_ports, [None, 22, 443, 8080, '443', 'any'])
+
+    def test_to_port_order(self):
+        ip_permissions = [NifcloudFwPermission('UDP', 'IN', 1000, to_port, cidr_ip='0.0.0.0/0') for to_port in [10000, 2000, None]]
+
+        sorted_ports = [ip_permission.to_port for ip_permission in sorted(ip_permissions, key=NifcloudFwPermission.get_sort_key)]
+        self.assertEqual(sorted_ports, [None, 2000, 10000])
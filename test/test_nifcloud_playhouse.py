@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from fixture_api import ERROR_RESPONSE, FixtureApi, copy_fixture, invoke, read_fixture
+
+from playwright.config import PlaywrightConfig
+from playwright.registry import PlayhouseFactory
+
+from sleety.region import NifcloudRegion
+
+
+class TestNifcloudPlayhouseRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = copy_fixture('inventory.insp.yml', self.work_dir)
+
+        patcher = mock.patch('playwright.limiter.random')
+        patcher.start().uniform.return_value = 0
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_retry_unavailable(self):
+        api = FixtureApi([
+            (503, ERROR_RESPONSE.format('Server.Unavailable', 'unavailable')),
+            (503, '<html>503 Service Unavailable</html>'),
+        ])
+        result = invoke(['inspire', self.inspiration_path], api)
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        # error status is not printed into the playbook
+        self.assertEqual(result.stdout, read_fixture('inventory.yml') + '\n')
+        self.assertEqual(api.failures, [])
+
+    def test_retry_exceeded(self):
+        api = FixtureApi([(503, ERROR_RESPONSE.format('Server.Unavailable', 'unavailable'))] * 4)
+        result = invoke(['inspire', self.inspiration_path], api)
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('inspiration[0] failed', result.stderr)
+        self.assertEqual(api.failures, [])
+
+    def test_client_error_not_retried(self):
+        api = FixtureApi([(400, ERROR_RESPONSE.format('Client.InvalidParameter', 'invalid'))])
+        result = invoke(['inspire', self.inspiration_path], api)
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('inspiration[0] failed', result.stderr)
+        # jp-east-1 of inspiration[0] fails without retry, and jp-east-1 of inspiration[1] succeeds
+        self.assertEqual(api.calls.count(('DescribeSecurityGroups', 'jp-east-1')), 2)
+
+
+class TestNifcloudPlayhouseRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.config = PlaywrightConfig()
+        self.config.load_file(copy_fixture('inventory.insp.yml', self.work_dir))
+        self.region = NifcloudRegion('jp-east-1')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def create_playhouse(self, playhouse_factory, inspiration):
+        playhouse = playhouse_factory.create('nifcloud')
+
+        with FixtureApi().patch():
+            playhouse.init(self.config, inspiration)
+
+        return playhouse
+
+    def test_rate_limiter_shared_by_user(self):
+        playhouse_factory = PlayhouseFactory()
+        inspirations = self.config.inspirations
+
+        rate_limiter = self.create_playhouse(playhouse_factory, inspirations[0]).get_rate_limiter(self.region)
+
+        self.assertIs(self.create_playhouse(playhouse_factory, inspirations[0]).get_rate_limiter(self.region), rate_limiter)
+        self.assertIsNot(self.create_playhouse(playhouse_factory, inspirations[1]).get_rate_limiter(self.region), rate_limiter)
+        self.assertIsNot(self.create_playhouse(PlayhouseFactory(), inspirations[0]).get_rate_limiter(self.region), rate_limiter)
+
+    def test_rate_limiter_starts_at_max_rate(self):
+        rate_limiter = self.create_playhouse(PlayhouseFactory(), self.config.inspirations[0]).get_rate_limiter(self.region)
+
+        self.assertEqual(rate_limiter.rate, 10.0)
+        self.assertEqual(rate_limiter.max_rate, 10.0)
+
+    def test_rate_limiter_settings(self):
+        inspiration = dict(self.config.inspirations[0], request_rate=2, max_request_rate=5)
+        playhouse_factory = PlayhouseFactory()
+
+        region = NifcloudRegion('jp-west-1')
+
+        rate_limiter = self.create_playhouse(playhouse_factory, inspiration).get_rate_limiter(region)
+
+        self.assertEqual(rate_limiter.rate, 2.0)
+        self.assertEqual(rate_limiter.max_rate, 5.0)
+        self.assertIsNot(self.create_playhouse(playhouse_factory, self.config.inspirations[0]).get_rate_limiter(region), rate_limiter)
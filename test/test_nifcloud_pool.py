@@ -0,0 +1,80 @@
+import threading
+import unittest
+
+from playwright.playhouse.nifcloud.pool import NifcloudConnectionPool, NifcloudConnectionPools
+
+from sleety.region import NifcloudRegion
+
+
+class TestNifcloudConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+
+    def create_connection(self, region, endpoint=None):
+        conn = (region.name, endpoint, len(self.created))
+        self.created.append(conn)
+        return conn
+
+    def test_connection_reused(self):
+        pool = NifcloudConnectionPool(self.create_connection)
+        region = NifcloudRegion('jp-east-1')
+
+        with pool.connection(region) as conn:
+            pass
+        with pool.connection(region) as reused_conn:
+            pass
+
+        self.assertIs(reused_conn, conn)
+        self.assertEqual(len(self.created), 1)
+
+    def test_connection_keyed_by_region_and_endpoint(self):
+        pool = NifcloudConnectionPool(self.create_connection)
+
+        with pool.connection(NifcloudRegion('jp-east-1')) as conn:
+            pass
+        with pool.connection(NifcloudRegion('jp-west-1')) as west_conn:
+            pass
+        with pool.connection(NifcloudRegion('jp-east-1'), endpoint='example.com') as endpoint_conn:
+            pass
+
+        self.assertEqual(conn, ('jp-east-1', None, 0))
+        self.assertEqual(west_conn, ('jp-west-1', None, 1))
+        self.assertEqual(endpoint_conn, ('jp-east-1', 'example.com', 2))
+
+    def test_connection_size(self):
+        pool = NifcloudConnectionPool(self.create_connection, size=2)
+        region = NifcloudRegion('jp-east-1')
+        acquired = []
+        waiting = threading.Event()
+
+        def acquire():
+            waiting.set()
+            with pool.connection(region) as conn:
+                acquired.append(conn)
+
+        with pool.connection(region) as conn, pool.connection(region):
+            thread = threading.Thread(target=acquire)
+            thread.start()
+            waiting.wait()
+            thread.join(0.1)
+
+            # waits until a connection is released
+            self.assertTrue(thread.is_alive())
+            self.assertEqual(acquired, [])
+
+        thread.join()
+        self.assertEqual(len(self.created), 2)
+        self.assertIn(acquired[0], self.created)
+        self.assertIsNotNone(conn)
+
+
+class TestNifcloudConnectionPools(unittest.TestCase):
+
+    def test_get(self):
+        pools = NifcloudConnectionPools()
+
+        pool = pools.get('key', lambda: NifcloudConnectionPool(None))
+
+        self.assertIs(pools.get('key', lambda: NifcloudConnectionPool(None)), pool)
+        self.assertIsNot(pools.get('other', lambda: NifcloudConnectionPool(None)), pool)
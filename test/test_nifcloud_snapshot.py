@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from fixture_api import FixtureApi, invoke, read_fixture
+
+from playwright.error import PlaywrightError
+from playwright.playhouse.nifcloud.snapshot import NifcloudSnapshot
+
+
+FW_GROUPS = [
+    {
+        'groupName': 'web',
+        'availabilityZone': 'east-11',
+        'groupLogLimit': '1000',
+        'ipPermissions': [
+            {'ipProtocol': 'TCP', 'inOut': 'IN', 'fromPort': '443', 'ipRanges': [{'cidrIp': '0.0.0.0/0'}]},
+            {'ipProtocol': 'ANY', 'inOut': 'OUT', 'groups': [{'groupName': 'db'}], 'description': 'to db'},
+        ],
+    },
+    # availabilityZone, groupLogLimit and ipPermissions may be missing
+    {'groupName': 'db'},
+]
+
+
+class TestNifcloudSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.snapshot = NifcloudSnapshot(os.path.join(self.work_dir, 'snapshot', 'snapshot.db'))
+
+    def tearDown(self):
+        self.snapshot.close()
+        shutil.rmtree(self.work_dir)
+
+    def query(self, sql):
+        return self.snapshot._connection.execute(sql).fetchall()
+
+    def test_save_and_load(self):
+        self.snapshot.save_fw_groups('user', 'jp-east-1', FW_GROUPS)
+
+        self.assertEqual(self.snapshot.load_fw_groups('user', 'jp-east-1'), FW_GROUPS)
+        self.assertEqual(self.query('SELECT group_name, availability_zone, log_limit FROM fw_groups ORDER BY rowid'), [
+            ('web', 'east-11', 1000),
+            ('db', None, None),
+        ])
+        rules_sql = 'SELECT group_name, ip_protocol, in_out, cidr_ip, source_group_name, from_port, to_port, description FROM fw_rules ORDER BY rowid'
+        self.assertEqual(self.query(rules_sql), [
+            ('web', 'TCP', 'IN', '0.0.0.0/0', None, 443, None, None),
+            ('web', 'ANY', 'OUT', None, 'db', None, None, 'to db'),
+        ])
+
+    def test_save_replaces_region(self):
+        self.snapshot.save_fw_groups('user', 'jp-east-1', FW_GROUPS)
+        self.snapshot.save_fw_groups('user', 'jp-west-1', FW_GROUPS)
+        self.snapshot.save_fw_groups('user', 'jp-east-1', FW_GROUPS[1:])
+
+        self.assertEqual(self.snapshot.load_fw_groups('user', 'jp-east-1'), FW_GROUPS[1:])
+        self.assertEqual(self.snapshot.load_fw_groups('user', 'jp-west-1'), FW_GROUPS)
+        self.assertEqual(self.snapshot.get_region_names('user'), ['jp-east-1', 'jp-west-1'])
+
+    def test_not_described(self):
+        self.snapshot.save_fw_groups('user', 'jp-east-1', [])
+
+        self.assertEqual(self.snapshot.load_fw_groups('user', 'jp-east-1'), [])
+        with self.assertRaises(PlaywrightError):
+            self.snapshot.load_fw_groups('user', 'jp-west-1')
+        with self.assertRaises(PlaywrightError):
+            self.snapshot.get_region_names('other')
+
+
+class TestInspireFromSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = os.path.join(self.work_dir, 'inventory.insp.yml')
+
+        with open(self.inspiration_path, 'w') as f:
+            f.write(read_fixture('inventory.insp.yml'))
+            f.write('\nplaywright_options:\n  snapshot_path: snapshot.db\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_inspire_from_snapshot(self):
+        expected = read_fixture('inventory.yml') + '\n'
+
+        result = invoke(['inspire', self.inspiration_path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.stdout, expected)
+
+        api = FixtureApi()
+        result = invoke(['inspire', '--from-snapshot', self.inspiration_path], api)
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.stdout, expected)
+        self.assertEqual(api.calls, [])
@@ -0,0 +1,100 @@
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+from unittest import mock
+
+from fixture_api import FixtureApi, invoke
+
+from playwright import profiler
+from playwright.config import PlaywrightConfig
+from playwright.registry import PlayhouseFactory
+
+from sleety import computing
+from sleety.region import NifcloudRegion
+
+
+CONFIG = '''---
+
+vars:
+  nifcloud_users:
+    fixture:
+      access_key: FIXTURE_ACCESS_KEY
+      secret_access_key: FIXTURE_SECRET_ACCESS_KEY
+
+inspirations:
+  - playhouse: nifcloud
+    user: fixture
+    regions:
+      - name: jp-east-1
+    modules:
+      - module: nifcloud_fw
+  - playhouse: nifcloud
+    user: fixture
+    regions:
+      - name: jp-west-1
+    modules:
+      - module: nifcloud_fw
+'''
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_summary(self):
+        prof = profiler.Profiler()
+
+        with prof.span('describe', region='jp-east-1'):
+            pass
+        prof.count('api_calls', action='DescribeSecurityGroups', region='jp-east-1')
+        prof.count('api_calls', action='DescribeSecurityGroups', region='jp-east-1')
+
+        summary = prof.generate_summary().splitlines()
+
+        self.assertEqual(summary[1].split()[:3], ['describe', 'region=jp-east-1', '1'])
+        self.assertEqual(summary[3].split(), ['api_calls', 'action=DescribeSecurityGroups', 'region=jp-east-1', '2'])
+
+
+class TestPlayhouseProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = os.path.join(self.work_dir, 'profile.insp.yml')
+        with open(self.inspiration_path, 'w') as f:
+            f.write(CONFIG)
+
+        # --profile replaces the process-wide profiler
+        patcher = mock.patch.object(profiler, '_profiler', profiler.NullProfiler())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_api_calls_by_inspiration(self):
+        result = invoke(['inspire', '--profile', self.inspiration_path], FixtureApi())
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        api_calls = [line.split()[1:] for line in result.stderr.splitlines() if line.startswith('api_calls ')]
+
+        # connections of the same user are shared, and calls are counted for the inspiration using them
+        self.assertIn(['action=DescribeSecurityGroups', 'inspiration=inspiration[0]', 'region=jp-east-1', '1'], api_calls)
+        self.assertIn(['action=DescribeSecurityGroups', 'inspiration=inspiration[1]', 'region=jp-west-1', '1'], api_calls)
+
+    def test_connection_pool_not_referring_playhouse(self):
+        config = PlaywrightConfig()
+        config.load_file(self.inspiration_path)
+        playhouse = PlayhouseFactory().create('nifcloud')
+
+        with FixtureApi().patch():
+            playhouse.init(config, config.inspirations[0])
+            playhouse.describe(NifcloudRegion('jp-east-1'), 'describe_fw_groups', computing.fw.describe_fw_groups)
+
+        connection_pool = playhouse.get_connection_pool()
+        playhouse_ref = weakref.ref(playhouse)
+        del playhouse
+        gc.collect()
+
+        self.assertIsNone(playhouse_ref())
+        self.assertIsNotNone(connection_pool)
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from fixture_api import FixtureApi, invoke
+
+from playwright import registry
+from playwright.error import PlaywrightUnsupportedError
+from playwright.playhouse.nifcloud.module.fw import NifcloudModuleFw
+from playwright.playhouse.nifcloud.playhouse import NifcloudPlayhouse
+from playwright.registry import PlayhouseFactory, load_module, load_playhouse
+
+
+CONFIG = '''---
+
+inspirations:
+  - playhouse: nifcloud
+    user: ~
+    access_key: FIXTURE_ACCESS_KEY
+    secret_access_key: FIXTURE_SECRET_ACCESS_KEY
+    regions:
+      - name: jp-east-1
+    modules:
+      - module: plugin_module
+        key: value
+'''
+
+
+class PluginModule():
+    instances = []
+
+    def __init__(self, playhouse, module_config):
+        self.playhouse = playhouse
+        self.module_config = module_config
+        self.instances.append(self)
+
+    def generate_tasks(self):
+        return iter([])
+
+
+class PluginPlayhouse():
+
+    @classmethod
+    def create_shared_options(cls):
+        return {'shared': object()}
+
+    def __init__(self, shared=None, name=None):
+        self.shared = shared
+        self.name = name
+
+
+class FakeEntryPoint():
+
+    def __init__(self, loaded):
+        self.loaded = loaded
+
+    def load(self):
+        return self.loaded
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.entry_points = {}
+        patcher = mock.patch.object(registry, '_find_entry_points', side_effect=lambda group: self.entry_points.get(group, {}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_builtins(self):
+        self.assertIs(load_playhouse('nifcloud'), NifcloudPlayhouse)
+        self.assertIs(load_module('nifcloud', 'nifcloud_fw'), NifcloudModuleFw)
+
+    def test_entry_points(self):
+        self.entry_points = {
+            'playwright.playhouses': {'plugin': FakeEntryPoint(PluginPlayhouse)},
+            'playwright.modules.nifcloud': {'plugin_module': FakeEntryPoint(PluginModule), 'nifcloud_fw': FakeEntryPoint(PluginModule)},
+        }
+
+        self.assertIs(load_playhouse('plugin'), PluginPlayhouse)
+        self.assertIs(load_module('nifcloud', 'plugin_module'), PluginModule)
+        # installed entry points override built-in ones
+        self.assertIs(load_module('nifcloud', 'nifcloud_fw'), PluginModule)
+
+    def test_unsupported(self):
+        with self.assertRaises(PlaywrightUnsupportedError):
+            load_playhouse('unknown')
+        with self.assertRaises(PlaywrightUnsupportedError):
+            load_module('nifcloud', 'unknown')
+        with self.assertRaises(PlaywrightUnsupportedError):
+            load_module('unknown', 'nifcloud_fw')
+
+    def test_playhouse_factory(self):
+        self.entry_points = {'playwright.playhouses': {'plugin': FakeEntryPoint(PluginPlayhouse)}}
+        playhouse_factory = PlayhouseFactory()
+
+        playhouse = playhouse_factory.create('plugin', name='a')
+        other_playhouse = playhouse_factory.create('plugin', name='b')
+
+        # shared options are created once for each factory
+        self.assertEqual((playhouse.name, other_playhouse.name), ('a', 'b'))
+        self.assertIs(other_playhouse.shared, playhouse.shared)
+        self.assertIsNot(PlayhouseFactory().create('plugin').shared, playhouse.shared)
+        self.assertEqual(playhouse_factory.create('plugin', shared='option').shared, 'option')
+
+    def test_inspire_plugin_module(self):
+        self.entry_points = {'playwright.modules.nifcloud': {'plugin_module': FakeEntryPoint(PluginModule)}}
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        inspiration_path = os.path.join(work_dir, 'plugin.insp.yml')
+
+        with open(inspiration_path, 'w') as f:
+            f.write(CONFIG)
+
+        del PluginModule.instances[:]
+        result = invoke(['inspire', inspiration_path], FixtureApi())
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        module, = PluginModule.instances
+        self.assertIsInstance(module.playhouse, NifcloudPlayhouse)
+        self.assertEqual(module.module_config, {'module': 'plugin_module', 'key': 'value'})
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from fixture_api import copy_fixture, invoke, read_fixture
+
+from playwright.render_pool import RenderPool
+
+
+class TestRenderPool(unittest.TestCase):
+    # inventory.yml has 11 tasks, which are rendered in several batches
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = copy_fixture('inventory.insp.yml', self.work_dir)
+        self.playbook_path = os.path.join(self.work_dir, 'inventory.yml')
+        self.expected = read_fixture('inventory.yml')
+
+        patcher = mock.patch.object(RenderPool, 'BATCH_SIZE', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_inspire(self):
+        for args in [[], ['--render-backend', 'native'], ['--stream']]:
+            result = invoke(['inspire', '--render-workers', '2'] + args + [self.inspiration_path])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertEqual(result.stdout, self.expected + '\n')
+
+    def test_inspire_incremental(self):
+        for _ in range(2):
+            result = invoke(['inspire', '--render-workers', '2', '--incremental', '-f', self.inspiration_path])
+
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(self.playbook_path, 'r') as f:
+                self.assertEqual(f.read(), self.expected)
+
+        self.assertIn('unchanged: 11, changed: 0, added: 0, removed: 0', result.stderr)
+
+    def test_batch(self):
+        copy_fixture('inventory.insp.yml', self.work_dir, 'other.insp.yml')
+
+        result = invoke(['batch', '-j', '2', '--render-workers', '2', self.work_dir])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        for filename in ['inventory.yml', 'other.yml']:
+            with open(os.path.join(self.work_dir, filename), 'r') as f:
+                self.assertEqual(f.read(), self.expected)
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from fixture_api import FixtureApi, copy_fixture, invoke, read_fixture
+
+from playwright.watch import WatchedConfig
+
+
+class StopWatch(Exception):
+    pass
+
+
+class TestWatchedConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = copy_fixture('inventory.insp.yml', self.work_dir)
+        self.vars_path = os.path.join(self.work_dir, 'vars.yml')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def append(self, path, content):
+        with open(path, 'a') as f:
+            f.write(content)
+
+    def test_is_changed(self):
+        watched_config = WatchedConfig(self.inspiration_path)
+        self.assertTrue(watched_config.is_changed())
+
+        watched_config.load()
+        self.assertFalse(watched_config.is_changed())
+
+        self.append(self.inspiration_path, '\n')
+        self.assertTrue(watched_config.is_changed())
+
+    def test_vars_file_changed(self):
+        self.append(self.vars_path, 'foo: 1\n')
+        self.append(self.inspiration_path, '\nvars_files:\n  - vars.yml\n')
+
+        watched_config = WatchedConfig(self.inspiration_path)
+        watched_config.load()
+        self.assertFalse(watched_config.is_changed())
+
+        self.append(self.vars_path, 'bar: 2\n')
+        self.assertTrue(watched_config.is_changed())
+
+    def test_load_failed(self):
+        self.append(self.inspiration_path, '\n- [invalid\n')
+
+        watched_config = WatchedConfig(self.inspiration_path)
+        with self.assertRaises(Exception):
+            watched_config.load()
+
+        # loaded again only after the config changes
+        self.assertIsNone(watched_config.config)
+        self.assertFalse(watched_config.is_changed())
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.inspiration_path = copy_fixture('inventory.insp.yml', self.work_dir)
+        self.playbook_path = os.path.join(self.work_dir, 'inventory.yml')
+        self.expected = read_fixture('inventory.yml')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def watch(self, polls, api=None):
+        # stops after the given number of polls
+        with mock.patch('playwright.cli.time.sleep', side_effect=[None] * (polls - 1) + [StopWatch()]):
+            result = invoke(['watch', '--interval', '0', self.work_dir], api)
+
+        self.assertIsInstance(result.exception, StopWatch)
+        return result
+
+    def test_watch(self):
+        result = self.watch(2)
+
+        # written once, since the playbook described again is unchanged
+        self.assertEqual(result.stdout, self.playbook_path + '\n')
+        with open(self.playbook_path, 'r') as f:
+            self.assertEqual(f.read(), self.expected)
+        self.assertEqual(sorted(os.listdir(self.work_dir)), ['inventory.insp.yml', 'inventory.yml'])
+
+    def test_watch_failed(self):
+        with open(self.playbook_path, 'w') as f:
+            f.write('previous')
+
+        with mock.patch('playwright.limiter.random') as random:
+            random.uniform.return_value = 0
+            result = self.watch(1, FixtureApi([(400, '<html>400 Bad Request</html>')]))
+
+        self.assertEqual(result.stdout, '')
+        self.assertIn('failed', result.stderr)
+        # the previous playbook is kept
+        with open(self.playbook_path, 'r') as f:
+            self.assertEqual(f.read(), 'previous')
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from playwright import writer
+
+
+class TestWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.work_dir, 'dir', 'playbook.yml')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def read(self, path):
+        with open(path, 'r') as f:
+            return f.read()
+
+    def list_files(self):
+        return sorted(os.path.relpath(os.path.join(dirpath, filename), self.work_dir)
+                      for dirpath, _, filenames in os.walk(self.work_dir) for filename in filenames)
+
+    def test_write_file(self):
+        self.assertTrue(writer.write_file(self.path, 'content'))
+        os.utime(self.path, (0, 0))
+
+        # unchanged file and its mtime are kept
+        self.assertFalse(writer.write_file(self.path, 'content'))
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+
+        self.assertTrue(writer.write_file(self.path, 'changed'))
+        self.assertEqual(self.read(self.path), 'changed')
+        self.assertEqual(self.list_files(), [os.path.join('dir', 'playbook.yml')])
+
+    def test_write_chunks(self):
+        self.assertTrue(writer.write_chunks(self.path, ['a', 'b', 'c']))
+        self.assertEqual(self.read(self.path), 'abc')
+
+        # not replaced unless complete
+        self.assertFalse(writer.write_chunks(self.path, ['d'], lambda: False))
+        self.assertEqual(self.read(self.path), 'abc')
+        self.assertEqual(self.list_files(), [os.path.join('dir', 'playbook.yml')])
+
+    def test_write_chunks_failed(self):
+        def generate_chunks():
+            yield 'd'
+            raise ValueError('failed')
+
+        writer.write_chunks(self.path, ['abc'])
+
+        with self.assertRaises(ValueError):
+            writer.write_chunks(self.path, generate_chunks())
+
+        self.assertEqual(self.read(self.path), 'abc')
+        self.assertEqual(self.list_files(), [os.path.join('dir', 'playbook.yml')])
+
+    def test_write_files(self):
+        paths = [os.path.join(self.work_dir, 'tasks', name) for name in ['a.yml', 'b.yml', 'c.yml']]
+        writer.write_file(paths[0], 'a')
+
+        written_paths = writer.write_files({paths[0]: 'a', paths[1]: 'b', paths[2]: 'c'}, max_workers=2)
+
+        self.assertEqual(written_paths, paths[1:])
+        self.assertEqual([self.read(path) for path in paths], ['a', 'b', 'c'])
+
+    def test_remove_stale_files(self):
+        tasks_dir = os.path.join(self.work_dir, 'tasks')
+        paths = [os.path.join(tasks_dir, *segments) for segments in [('0', 'a.yml'), ('0', 'b.yml'), ('1', 'c.yml'), ('1', 'd.txt')]]
+        for path in paths:
+            writer.write_file(path, '')
+
+        removed_paths = writer.remove_stale_files(tasks_dir, paths[:1])
+
+        # files of other extensions are kept, and directories left empty are removed
+        self.assertEqual(removed_paths, [paths[1], paths[2]])
+        self.assertEqual(self.list_files(), [os.path.join('tasks', '0', 'a.yml'), os.path.join('tasks', '1', 'd.txt')])
+
+        writer.remove_stale_files(tasks_dir, [])
+        self.assertEqual(sorted(os.listdir(tasks_dir)), ['1'])